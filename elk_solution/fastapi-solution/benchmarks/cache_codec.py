@@ -0,0 +1,147 @@
+"""Сравнение форматов кэша сущностей (src.services.codec).
+
+Для синтетических записей (персона с фильмографией, полный фильм, страница
+фильмов персоны) печатает размер записи и время кодирования и декодирования
+в каждом формате и с каждым доступным сжатием. С --redis записи кладутся
+в Redis, и для них печатается MEMORY USAGE.
+
+Запуск из каталога fastapi-solution:
+    python -m benchmarks.cache_codec --films 200
+    python -m benchmarks.cache_codec --redis localhost:6379
+"""
+
+import argparse
+import asyncio
+import timeit
+from typing import List
+from uuid import uuid4
+
+from pydantic import TypeAdapter
+from redis.asyncio import Redis
+from src.models.film import Film, FilmFull
+from src.models.person import Person
+from src.services import codec as codec_module
+from src.services.codec import CacheCodec
+
+BENCHMARK_KEY_PREFIX = "benchmark:cache_codec:"
+
+
+def make_person(films: int) -> Person:
+    return Person(
+        id=str(uuid4()),
+        full_name="George Lucas",
+        films=[
+            {"uuid": uuid4(), "roles": ["director", "writer"]} for _ in range(films)
+        ],
+    )
+
+
+def make_film_full(cast: int) -> FilmFull:
+    def people(count: int) -> list:
+        return [{"id": str(uuid4()), "name": f"Person {i}"} for i in range(count)]
+
+    return FilmFull(
+        id=str(uuid4()),
+        title="Star Wars: Episode IV - A New Hope",
+        imdb_rating=8.6,
+        description="The Imperial Forces hold Princess Leia hostage. " * 5,
+        genres=[{"id": str(uuid4()), "name": "Sci-Fi"}],
+        actors=people(cast),
+        writers=people(3),
+        directors=people(1),
+    )
+
+
+def make_films(films: int) -> List[Film]:
+    return [
+        Film(id=str(uuid4()), title=f"Film {i}", imdb_rating=7.5) for i in range(films)
+    ]
+
+
+def codecs(min_size: int) -> list:
+    compressions = [None]
+    if codec_module.zstandard is not None:
+        compressions.append("zstd")
+    if codec_module.lz4 is not None:
+        compressions.append("lz4")
+
+    formats = ["json", "orjson"]
+    if codec_module.msgpack is not None:
+        formats.append("msgpack")
+
+    return [
+        (f"{fmt}+{compression or 'raw'}", CacheCodec(fmt, compression, min_size))
+        for fmt in formats
+        for compression in compressions
+    ]
+
+
+async def redis_memory(redis: Redis, key: str, data: bytes) -> int:
+    await redis.set(key, data, ex=60)
+    try:
+        return await redis.memory_usage(key)
+    finally:
+        await redis.delete(key)
+
+
+async def run(args):
+    entries = [
+        ("person", Person, make_person(args.films)),
+        ("film", FilmFull, make_film_full(args.cast)),
+        ("person_films", List[Film], make_films(args.page_size)),
+    ]
+    redis = None
+    if args.redis:
+        host, port = args.redis.split(":")
+        redis = Redis(host=host, port=int(port))
+
+    try:
+        for entity, model, value in entries:
+            adapter = TypeAdapter(model)
+            print(entity)
+            for name, codec in codecs(args.min_size):
+                data = codec.dumps(adapter, value)
+                encode = min(
+                    timeit.repeat(
+                        lambda: codec.dumps(adapter, value),
+                        number=args.number,
+                        repeat=args.repeat,
+                    )
+                )
+                decode = min(
+                    timeit.repeat(
+                        lambda: codec.loads(adapter, data),
+                        number=args.number,
+                        repeat=args.repeat,
+                    )
+                )
+                line = (
+                    f"  {name:<16} {len(data):>7} Б"
+                    f"  encode {encode / args.number * 1e6:>8.1f} мкс"
+                    f"  decode {decode / args.number * 1e6:>8.1f} мкс"
+                )
+                if redis is not None:
+                    memory = await redis_memory(
+                        redis, f"{BENCHMARK_KEY_PREFIX}{entity}:{name}", data
+                    )
+                    line += f"  redis {memory} Б"
+                print(line)
+    finally:
+        if redis is not None:
+            await redis.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--films", type=int, default=200)
+    parser.add_argument("--cast", type=int, default=30)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--min-size", type=int, default=1024)
+    parser.add_argument("--number", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--redis", help="host:port для замера MEMORY USAGE")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Объём и время страницы списка фильмов с фильтрацией _source и без неё.
+
+Для страниц выдачи /api/v1/films/ сравнивает прежний запрос (полный
+_source и Film(**source)) с нынешним (только FILM_LIST_FIELDS
+и film_from_source): размер JSON ответа Elasticsearch на страницу и время
+от запроса до готового списка моделей.
+
+Запуск из каталога fastapi-solution при поднятом Elasticsearch с индексом movies:
+    python -m benchmarks.film_list_source --elastic localhost:9200 --page-size 50
+"""
+
+import argparse
+import asyncio
+import time
+
+import orjson
+from elasticsearch import AsyncElasticsearch
+from src.models.film import FILM_LIST_FIELDS, Film, film_from_source
+
+
+async def measure(elastic, body: dict, make_film, pages: int, page_size: int):
+    size = 0
+    start = time.perf_counter()
+    for page in range(pages):
+        response = await elastic.search(
+            index="movies", body=body, from_=page * page_size, size=page_size
+        )
+        [make_film(hit["_source"]) for hit in response.body["hits"]["hits"]]
+        size += len(orjson.dumps(response.body))
+    return size / pages, (time.perf_counter() - start) / pages
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--elastic", default="localhost:9200")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=20)
+    args = parser.parse_args()
+
+    elastic = AsyncElasticsearch(hosts=[f"http://{args.elastic}"])
+    query = {"query": {"match_all": {}}, "sort": [{"imdb_rating": "desc"}]}
+    variants = (
+        ("полный _source", query, lambda source: Film(**source)),
+        ("FILM_LIST_FIELDS", {**query, "_source": FILM_LIST_FIELDS}, film_from_source),
+    )
+
+    for name, body, make_film in variants:
+        # Первый прогон прогревает кэши Elasticsearch и соединение
+        await measure(elastic, body, make_film, 1, args.page_size)
+        size, elapsed = await measure(
+            elastic, body, make_film, args.pages, args.page_size
+        )
+        print(
+            f"{name}: {size / 1024:.1f} КБ на страницу, "
+            f"{elapsed * 1000:.2f} мс на страницу"
+        )
+
+    await elastic.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+"""Сравнение старого и нового расчёта ролей персон в фильмах.
+
+Строит синтетическую выдачу фильмов и страницу поиска персон и печатает
+время одного расчёта ролей для старого перебора (фильм × персона × роль)
+и для однопроходного person_film_roles.
+
+Запуск из каталога fastapi-solution:
+    python -m benchmarks.person_film_roles --films 1000 --persons 50
+"""
+
+import argparse
+import timeit
+from random import sample
+from uuid import UUID, uuid4
+
+from src.services.person import ROLE_FIELDS, person_film_roles
+
+
+def legacy_person_film_roles(films: list, person_ids: list) -> list:
+    # Прежняя реализация: множество id пересобирается для каждой пары
+    # (фильм, персона) и каждого поля ролей.
+    films_field = []
+    for film in films:
+        for person_id in person_ids:
+            roles = []
+            for role_field, role_name in ROLE_FIELDS.items():
+                ids: set = {person["id"] for person in film[role_field]}
+                if person_id in ids:
+                    roles.append(role_name)
+
+            if roles:
+                films_field.append(
+                    {
+                        "person_id": UUID(person_id),
+                        "uuid": UUID(film["id"]),
+                        "roles": sorted(roles),
+                    }
+                )
+    return films_field
+
+
+def make_films(films: int, people: list, cast: int) -> list:
+    return [
+        {
+            "id": str(uuid4()),
+            "actors": [{"id": person_id} for person_id in sample(people, cast)],
+            "writers": [{"id": person_id} for person_id in sample(people, 3)],
+            "directors": [{"id": person_id} for person_id in sample(people, 1)],
+        }
+        for _ in range(films)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--films", type=int, default=1000)
+    parser.add_argument("--persons", type=int, default=50)
+    parser.add_argument("--people", type=int, default=5000)
+    parser.add_argument("--cast", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    people = [str(uuid4()) for _ in range(args.people)]
+    films = make_films(args.films, people, args.cast)
+    person_ids = sample(people, args.persons)
+
+    for name, roles in (
+        ("старый", legacy_person_film_roles),
+        ("новый", person_film_roles),
+    ):
+        seconds = min(
+            timeit.repeat(
+                lambda: roles(films, person_ids), number=1, repeat=args.repeat
+            )
+        )
+        print(f"Роли ({name}): {seconds * 1000:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import asyncio
+import inspect
+from functools import wraps
+from typing import Any, Awaitable, Callable, Set
+
+from fastapi_cache import FastAPICache
+from fastapi_cache.coder import Coder
+from prometheus_client import Counter
+from pydantic import TypeAdapter
+from src.core.logger import logger
+from src.services.codec import codec
+from src.settings import CACHED_RESPONSE_HEADERS, RESPONSE_CACHE_TTL
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Ключи, которые сейчас обновляются в фоне, и ссылки на задачи обновления,
+# чтобы их не собрал сборщик мусора
+_refreshing: Set[str] = set()
+_refresh_tasks: Set[asyncio.Task] = set()
+
+_response_adapter: TypeAdapter = TypeAdapter(Any)
+
+response_cache_requests_total = Counter(
+    "response_cache_requests_total",
+    "Response cache lookups by result",
+    ("route", "result"),
+)
+
+
+class ResponseCoder(Coder):
+    # Ответы в кэше хранятся в том же формате, что и сущности (CACHE_CODEC)
+    @classmethod
+    def encode(cls, value: Any) -> bytes:  # type: ignore[override]
+        return codec.dumps(_response_adapter, value)
+
+    @classmethod
+    def decode(cls, value: bytes) -> Any:  # type: ignore[override]
+        return codec.loads(_response_adapter, value)
+
+
+def cache(route: str) -> Callable:
+    """
+    Кэш ответов поверх FastAPICache с режимом stale-while-revalidate.
+    Время жизни задаётся для маршрута в RESPONSE_CACHE_TTL парой
+    (soft, hard): до soft ответ свежий, с soft до hard он отдаётся
+    из кэша сразу, а в фоне пересчитывается, после hard запись удаляется.
+    Вместе с ответом кэшируются заголовки из CACHED_RESPONSE_HEADERS,
+    которые выставил обработчик.
+    """
+    soft_ttl, hard_ttl = RESPONSE_CACHE_TTL[route]
+
+    def wrapper(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        signature = inspect.signature(func)
+        # Обработчику, который сам выставляет заголовки, передаётся response
+        wants_response = "response" in signature.parameters
+
+        async def call(response: Response, args: tuple, kwargs: dict) -> dict:
+            if wants_response:
+                kwargs = {**kwargs, "response": response}
+            result = await func(*args, **kwargs)
+            headers = {
+                name: response.headers[name]
+                for name in CACHED_RESPONSE_HEADERS
+                if name in response.headers
+            }
+            return {"result": result, "headers": headers}
+
+        @wraps(func)
+        async def inner(*args, request: Request, response: Response, **kwargs):
+            if (
+                request.headers.get("Cache-Control") in ("no-store", "no-cache")
+                or not FastAPICache.get_enable()
+            ):
+                response_cache_requests_total.labels(route, "bypass").inc()
+                return (await call(response, args, kwargs))["result"]
+
+            coder = FastAPICache.get_coder()
+            backend = FastAPICache.get_backend()
+            key = FastAPICache.get_key_builder()(
+                func,
+                route,
+                request=request,
+                response=response,
+                args=args,
+                kwargs=kwargs,
+            )
+
+            try:
+                ttl, cached = await backend.get_with_ttl(key)
+            except Exception:
+                logger.warning(f"Error retrieving cache key '{key}'", exc_info=True)
+                ttl, cached = 0, None
+
+            entry = None
+            if cached is not None:
+                try:
+                    entry = coder.decode(cached)
+                except ValueError:
+                    # Ответ, сохранённый в другом формате, пересчитывается
+                    logger.warning(f"Unable to decode cache key '{key}'", exc_info=True)
+
+            if entry is None:
+                response_cache_requests_total.labels(route, "miss").inc()
+                entry = await call(response, args, kwargs)
+                cached = coder.encode(entry)
+                await _store(key, cached, hard_ttl)
+                age = 0
+            else:
+                response.headers.update(entry["headers"])
+                age = hard_ttl - ttl
+                response_cache_requests_total.labels(
+                    route, "stale" if age >= soft_ttl else "hit"
+                ).inc()
+                if age >= soft_ttl and key not in _refreshing:
+                    _refreshing.add(key)
+                    task = asyncio.create_task(
+                        _refresh(key, hard_ttl, call, args, kwargs)
+                    )
+                    _refresh_tasks.add(task)
+                    task.add_done_callback(_refresh_tasks.discard)
+
+            response.headers["Cache-Control"] = f"max-age={max(soft_ttl - age, 0)}"
+            etag = f"W/{hash(cached)}"
+            if request.headers.get("if-none-match") == etag:
+                response.status_code = 304
+                return response
+            response.headers["ETag"] = etag
+            return entry["result"]
+
+        parameters = [
+            parameter
+            for parameter in signature.parameters.values()
+            if parameter.name != "response"
+        ]
+        inner.__signature__ = signature.replace(  # type: ignore
+            parameters=[
+                *parameters,
+                inspect.Parameter(
+                    "request", inspect.Parameter.KEYWORD_ONLY, annotation=Request
+                ),
+                inspect.Parameter(
+                    "response", inspect.Parameter.KEYWORD_ONLY, annotation=Response
+                ),
+            ]
+        )
+        return inner
+
+    return wrapper
+
+
+async def _store(key: str, value: Any, expire: int):
+    try:
+        await FastAPICache.get_backend().set(key, value, expire)
+    except Exception:
+        logger.warning(f"Error setting cache key '{key}'", exc_info=True)
+
+
+async def _refresh(key: str, expire: int, call: Callable, args: tuple, kwargs: dict):
+    try:
+        entry = await call(Response(), args, kwargs)
+        await _store(key, FastAPICache.get_coder().encode(entry), expire)
+    except Exception:
+        # Устаревший ответ останется в кэше до hard TTL
+        logger.warning(f"Unable to refresh cache key '{key}'", exc_info=True)
+    finally:
+        _refreshing.discard(key)
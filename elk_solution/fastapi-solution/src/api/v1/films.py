@@ -1,16 +1,28 @@
 from http import HTTPStatus
-from typing import Annotated, Dict, List, Optional
+from typing import Annotated, Awaitable, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi_cache.decorator import cache
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from pydantic import BaseModel
+from src.api.cache import cache
+from src.db.elastic import MAX_PAGE_SIZE
 from src.services.auth import get_jwt_with_roles
-from src.services.film import FilmService, get_film_service
-from src.settings import CACHED_RESPONSE_TTL
+from src.services.film import (
+    FilmService,
+    InvalidCursorError,
+    PageTooDeepError,
+    get_film_service,
+)
 
 router = APIRouter()
 
+CURSOR_DESCRIPTION = (
+    "Opaque cursor from the X-Next-Cursor header of the previous page, "
+    "replaces page_number for deep pagination"
+)
 
+
+# Списки собираются через model_construct: ответ всё равно один раз
+# валидируется FastAPI по response_model
 class Film(BaseModel):
     uuid: str
     title: str
@@ -35,22 +47,47 @@ class FilmFull(Film):
     directors: List[Dict[str, str]]
 
 
+async def paginate(response: Response, page: Awaitable) -> list:
+    try:
+        films, next_cursor = await page
+    except InvalidCursorError:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="invalid cursor")
+    except PageTooDeepError:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail="page is too deep, use cursor pagination",
+        )
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return films
+
+
 @router.get("/search", response_model=List[Film])
-@cache(expire=CACHED_RESPONSE_TTL)
+@cache("films_search")
 async def search_films(
     user: Annotated[dict, Depends(get_jwt_with_roles(["Subscriber", "Admin"]))],
+    response: Response,
     query: str = Query(None),
-    page_size: int = Query(50, description="Pagination page size", ge=1),
+    page_size: int = Query(
+        50, description="Pagination page size", ge=1, le=MAX_PAGE_SIZE
+    ),
     page_number: int = Query(1, description="Pagination page number", ge=1),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
     film_service: FilmService = Depends(get_film_service),
 ) -> List[Film]:
 
     if query:
-        films = await film_service.search_films(
-            query=query, page_size=page_size, page_number=page_number
+        films = await paginate(
+            response,
+            film_service.search_films(
+                query=query, page_size=page_size, page_number=page_number, cursor=cursor
+            ),
         )
         return [
-            Film(uuid=film.id, title=film.title, imdb_rating=film.imdb_rating)
+            Film.model_construct(
+                uuid=film.id, title=film.title, imdb_rating=film.imdb_rating
+            )
             for film in films
         ]
     return []
@@ -58,7 +95,7 @@ async def search_films(
 
 # Внедряем FilmService с помощью Depends(get_film_service)
 @router.get("/{film_id}", response_model=FilmFull)
-@cache(expire=CACHED_RESPONSE_TTL)
+@cache("film_details")
 async def film_details(
     user: Annotated[dict, Depends(get_jwt_with_roles(["Subscriber", "Admin"]))],
     film_id: str,
@@ -69,22 +106,23 @@ async def film_details(
     if not film:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="film not found")
 
-    film.genres = [
+    # film может быть общим объектом из кэша процесса, поэтому не изменяется
+    genres = [
         Genre(uuid=genre["id"], name=genre["name"]).model_dump()
         for genre in film.genres
     ]
 
-    film.actors = [
+    actors = [
         RawPerson(uuid=actor["id"], full_name=actor["name"]).model_dump()
         for actor in film.actors
     ]
 
-    film.writers = [
+    writers = [
         RawPerson(uuid=writer["id"], full_name=writer["name"]).model_dump()
         for writer in film.writers
     ]
 
-    film.directors = [
+    directors = [
         RawPerson(uuid=director["id"], full_name=director["name"]).model_dump()
         for director in film.directors
     ]
@@ -94,20 +132,24 @@ async def film_details(
         title=film.title,
         imdb_rating=film.imdb_rating,
         description=film.description,
-        genre=film.genres,
-        actors=film.actors,
-        writers=film.writers,
-        directors=film.directors,
+        genre=genres,
+        actors=actors,
+        writers=writers,
+        directors=directors,
     )
 
 
 @router.get("/", response_model=List[Film])
-@cache(expire=CACHED_RESPONSE_TTL)
+@cache("popular_films")
 async def popular_films(
+    response: Response,
     sort: str = Query(None),
     genre: str = Query(None),
-    page_size: int = Query(50, description="Pagination page size", ge=1),
+    page_size: int = Query(
+        50, description="Pagination page size", ge=1, le=MAX_PAGE_SIZE
+    ),
     page_number: int = Query(1, description="Pagination page number", ge=1),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
     film_service: FilmService = Depends(get_film_service),
 ) -> List[Film]:
 
@@ -116,14 +158,20 @@ async def popular_films(
         descending = sort.startswith("-")
         sort = sort.lstrip("-")
 
-    films = await film_service.get_popular_films(
-        sort_param=sort,
-        descending=descending,
-        genre_filter=genre,
-        page_size=page_size,
-        page_number=page_number,
+    films = await paginate(
+        response,
+        film_service.get_popular_films(
+            sort_param=sort,
+            descending=descending,
+            genre_filter=genre,
+            page_size=page_size,
+            page_number=page_number,
+            cursor=cursor,
+        ),
     )
     return [
-        Film(uuid=film.id, title=film.title, imdb_rating=film.imdb_rating)
+        Film.model_construct(
+            uuid=film.id, title=film.title, imdb_rating=film.imdb_rating
+        )
         for film in films
     ]
@@ -2,11 +2,10 @@ from http import HTTPStatus
 from typing import Annotated, List
 
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi_cache.decorator import cache
 from pydantic import BaseModel
+from src.api.cache import cache
 from src.services.auth import get_jwt_with_roles
 from src.services.genre import GenreService, get_genre_service
-from src.settings import CACHED_RESPONSE_TTL
 
 router = APIRouter()
 
@@ -17,7 +16,7 @@ class Genre(BaseModel):
 
 
 @router.get("/")
-@cache(expire=CACHED_RESPONSE_TTL)
+@cache("genre_list")
 async def genre_list(
     user: Annotated[dict, Depends(get_jwt_with_roles(["Subscriber", "Admin"]))],
     genre_service: GenreService = Depends(get_genre_service),
@@ -30,7 +29,7 @@ async def genre_list(
 
 
 @router.get("/{genre_id}", response_model=Genre)
-@cache(expire=CACHED_RESPONSE_TTL)
+@cache("genre_details")
 async def genre_details(
     user: Annotated[dict, Depends(get_jwt_with_roles(["Subscriber", "Admin"]))],
     genre_id: str,
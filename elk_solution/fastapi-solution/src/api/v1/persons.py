@@ -3,14 +3,16 @@ from typing import Annotated, Dict, List, Union
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi_cache.decorator import cache
 from pydantic import BaseModel
+from src.api.cache import cache
+from src.db.elastic import MAX_PAGE_SIZE, PageTooDeepError
 from src.services.auth import get_jwt_with_roles
 from src.services.person import PersonService, get_person_service
-from src.settings import CACHED_RESPONSE_TTL
 
 router = APIRouter()
 
+PAGE_TOO_DEEP = "page is too deep"
+
 
 class Person(BaseModel):
     uuid: UUID
@@ -28,16 +30,23 @@ class Film(BaseModel):
 
 
 @router.get("/search")
-@cache(expire=CACHED_RESPONSE_TTL)
+@cache("person_search")
 async def person_search(
     user: Annotated[dict, Depends(get_jwt_with_roles(["Subscriber", "Admin"]))],
     query: str,
-    page_size: int = Query(50, description="Pagination page size", ge=1),
+    page_size: int = Query(
+        50, description="Pagination page size", ge=1, le=MAX_PAGE_SIZE
+    ),
     page_number: int = Query(1, description="Pagination page number", ge=1),
     person_service: PersonService = Depends(get_person_service),
 ) -> List[Person]:
 
-    persons = await person_service.search_by_full_name(query, page_number, page_size)
+    try:
+        persons = await person_service.search_by_full_name(
+            query, page_number, page_size
+        )
+    except PageTooDeepError:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=PAGE_TOO_DEEP)
 
     if not persons:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="person not found")
@@ -49,7 +58,7 @@ async def person_search(
 
 
 @router.get("/{person_id}", response_model=Person)
-@cache(expire=CACHED_RESPONSE_TTL)
+@cache("person_details")
 async def person_details(
     user: Annotated[dict, Depends(get_jwt_with_roles(["Subscriber", "Admin"]))],
     person_id: str,
@@ -63,13 +72,22 @@ async def person_details(
 
 
 @router.get("/{person_id}/film")
-@cache(expire=CACHED_RESPONSE_TTL)
+@cache("person_films")
 async def person_film_list(
     user: Annotated[dict, Depends(get_jwt_with_roles(["Subscriber", "Admin"]))],
     person_id: str,
+    page_size: int = Query(
+        50, description="Pagination page size", ge=1, le=MAX_PAGE_SIZE
+    ),
+    page_number: int = Query(1, description="Pagination page number", ge=1),
     person_service: PersonService = Depends(get_person_service),
 ) -> list[Film]:
-    films = await person_service.get_films_by_person_id(person_id)
+    try:
+        films = await person_service.get_films_by_person_id(
+            person_id, page_number, page_size
+        )
+    except PageTooDeepError:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=PAGE_TOO_DEEP)
 
     if not films:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="person not found")
@@ -1,8 +1,16 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Response, status
 from fastapi.responses import JSONResponse
-from src.services.auth import get_jwt_with_roles, security_jwt
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from src.core.config import settings
+from src.services import auth, cache
+from src.services.auth import (
+    get_jwt_with_roles,
+    require_internal_token,
+    security_jwt,
+)
+from src.services.coalescing import single_flight
 
 router = APIRouter()
 
@@ -33,3 +41,72 @@ async def perform_healthcheck_w_auth_and_role(
     Healthcheck endpoint
     """
     return JSONResponse(content={"status": "UP", "user": user})
+
+
+@router.get(
+    "/metrics",
+    include_in_schema=False,
+    dependencies=[Depends(require_internal_token)],
+)
+async def prometheus_metrics() -> Response:
+    """
+    Process metrics in the Prometheus text format
+    """
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@router.get(
+    "/internal/cache",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(require_internal_token)],
+)
+async def entity_cache_stats() -> dict:
+    """
+    Hit/miss counters of the entity cache
+    """
+    local_cache = cache.local_cache
+    return {
+        "local": {
+            "enabled": local_cache is not None,
+            "size": len(local_cache) if local_cache is not None else 0,
+        },
+        "entities": {
+            entity: stats.snapshot() for entity, stats in cache.cache_stats.items()
+        },
+    }
+
+
+@router.get(
+    "/internal/coalescing",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(require_internal_token)],
+)
+async def coalescing_stats() -> dict:
+    """
+    Number of requests that awaited an in-flight load instead of querying ES
+    """
+    return {
+        namespace: stats.snapshot() for namespace, stats in single_flight.stats.items()
+    }
+
+
+@router.get(
+    "/internal/auth",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(require_internal_token)],
+)
+async def auth_stats() -> dict:
+    """
+    Circuit breaker state and counters of auth service calls
+    """
+    return {
+        "mode": settings.auth_verification_mode,
+        "breaker": auth.auth_breaker.snapshot(),
+        "cached_decisions": len(auth.verification_cache),
+        "blacklist_filter": {
+            "loaded": auth.blacklist_filter.loaded,
+            "size": (
+                auth.blacklist_filter.bloom.count if auth.blacklist_filter.bloom else 0
+            ),
+        },
+    }
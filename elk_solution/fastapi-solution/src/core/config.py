@@ -24,9 +24,56 @@ class Settings(BaseSettings):
     redis_port: int = Field(6379, alias="REDIS_PORT")
     # Настройки Elasticsearch
     elastic_connect: str = Field("localhost:9200", alias="ELASTIC_CONNECT")
+    # Кэш сущностей в памяти процесса перед Redis
+    local_cache_enabled: bool = Field(True, alias="LOCAL_CACHE_ENABLED")
+    local_cache_size: int = Field(10000, alias="LOCAL_CACHE_SIZE")
+    local_cache_ttl: float = Field(10, alias="LOCAL_CACHE_TTL")
+    # Склейка промахов кэша между воркерами через блокировку в Redis
+    coalescing_redis_lock: bool = Field(False, alias="COALESCING_REDIS_LOCK")
+    coalescing_lock_timeout: float = Field(5, alias="COALESCING_LOCK_TIMEOUT")
+    coalescing_lock_wait: float = Field(2, alias="COALESCING_LOCK_WAIT")
+    # Формат значений кэша в Redis: json, orjson или msgpack, и сжатие
+    # (zstd или lz4) записей от CACHE_COMPRESSION_MIN_SIZE байт. Всё, кроме
+    # json и orjson без сжатия, требует extras cache-codecs
+    cache_codec: str = Field("json", alias="CACHE_CODEC")
+    cache_compression: Optional[str] = Field(None, alias="CACHE_COMPRESSION")
+    cache_compression_min_size: int = Field(1024, alias="CACHE_COMPRESSION_MIN_SIZE")
+    # Как часто перечитывать жанры в индекс в памяти процесса, секунд
+    genre_index_refresh_interval: float = Field(
+        60, alias="GENRE_INDEX_REFRESH_INTERVAL"
+    )
 
     auth_service_host: str = Field("localhost", alias="AUTH_SERVICE_HOST")
     auth_service_port: int = Field(8002, alias="AUTH_SERVICE_PORT")
+    # remote — токен проверяет сервис авторизации, local — только подпись
+    # и чёрный список в Redis. Решения кэшируются в процессе на AUTH_CACHE_TTL
+    auth_verification_mode: str = Field("remote", alias="AUTH_VERIFICATION_MODE")
+    auth_cache_size: int = Field(10000, alias="AUTH_CACHE_SIZE")
+    auth_cache_ttl: float = Field(30, alias="AUTH_CACHE_TTL")
+    # Таймаут запроса к сервису авторизации и размыкатель: после
+    # AUTH_BREAKER_FAILURE_THRESHOLD ошибок или медленных ответов подряд
+    # сервис не вызывается AUTH_BREAKER_RESET_TIMEOUT секунд
+    auth_service_timeout: float = Field(1, alias="AUTH_SERVICE_TIMEOUT")
+    auth_breaker_failure_threshold: int = Field(
+        5, alias="AUTH_BREAKER_FAILURE_THRESHOLD"
+    )
+    auth_breaker_slow_call_duration: float = Field(
+        0.5, alias="AUTH_BREAKER_SLOW_CALL_DURATION"
+    )
+    auth_breaker_reset_timeout: float = Field(30, alias="AUTH_BREAKER_RESET_TIMEOUT")
+    # Фильтр Блума отозванных токенов перед проверкой чёрного списка в Redis
+    blacklist_filter_capacity: int = Field(100000, alias="BLACKLIST_FILTER_CAPACITY")
+    blacklist_filter_error_rate: float = Field(
+        0.001, alias="BLACKLIST_FILTER_ERROR_RATE"
+    )
+    blacklist_filter_refresh_interval: float = Field(
+        60, alias="BLACKLIST_FILTER_REFRESH_INTERVAL"
+    )
+    # Пока сервис авторизации пишет отзыв под самим токеном и не публикует
+    # "auth:<token_id>", фильтр узнаёт об отзыве только при перестройке,
+    # и токены, которых в нём нет, всё равно проверяются в Redis. Выключить,
+    # когда сервис авторизации перейдёт на blacklist:<token_id> с публикацией
+    blacklist_legacy_keys: bool = Field(True, alias="BLACKLIST_LEGACY_KEYS")
 
     secret_key: str = Field("", alias="SECRET_KEY")
     algorithm: str = Field("", alias="ALGORITHM")
@@ -34,6 +81,10 @@ class Settings(BaseSettings):
     refresh_token_ttl: Optional[int] = Field(None, alias="REFRESH_TOKEN_TTL")
 
     sentry_dsn: Optional[str] = Field(None, alias="SENTRY_DSN")
+    # Токен для /metrics и /internal/*: заголовок
+    # "Authorization: Bearer <INTERNAL_API_TOKEN>". Без токена эти
+    # маршруты отвечают 403, потому что порт приложения опубликован наружу
+    internal_api_token: Optional[str] = Field(None, alias="INTERNAL_API_TOKEN")
 
     auth_check_is_on: bool = Field(True, alias="AUTH_CHECK_IS_ON")
 
@@ -1,10 +1,129 @@
-from typing import Optional
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator, Optional
 
+from elastic_transport import AsyncTransport, TransportApiResponse
 from elasticsearch import AsyncElasticsearch
+from prometheus_client import Counter, Histogram
+
+SEARCH_ALL_BATCH_SIZE = 500
+SEARCH_ALL_KEEP_ALIVE = "1m"
+# Наибольшее значение неявного _shard_doc в sort страниц point in time
+MAX_SHARD_DOC = 2**63 - 1
+# index.max_result_window: глубже from + size не работает,
+# дальше листать можно только курсором
+MAX_RESULT_WINDOW = 10000
+MAX_PAGE_SIZE = 100
 
 es: Optional[AsyncElasticsearch] = None
 
 
+class PageTooDeepError(Exception):
+    pass
+
+
+elasticsearch_requests_total = Counter(
+    "elasticsearch_requests_total",
+    "Elasticsearch requests",
+    ("operation", "status"),
+)
+elasticsearch_request_duration_seconds = Histogram(
+    "elasticsearch_request_duration_seconds",
+    "Elasticsearch request latency",
+    ("operation",),
+)
+
+
+def operation_name(target: str) -> str:
+    # "/movies/_doc/<id>" -> "_doc", "/_pit" -> "_pit": индекс и id в метки не идут
+    for part in target.split("?", 1)[0].split("/"):
+        if part.startswith("_"):
+            return part
+    return "other"
+
+
+class MetricsTransport(AsyncTransport):
+    async def perform_request(  # type: ignore[override]
+        self, method: str, target: str, **kwargs
+    ) -> TransportApiResponse:
+        operation = operation_name(target)
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = await super().perform_request(method, target, **kwargs)
+            status = str(response.meta.status)
+            return response
+        finally:
+            elasticsearch_request_duration_seconds.labels(operation).observe(
+                time.perf_counter() - start
+            )
+            elasticsearch_requests_total.labels(operation, status).inc()
+
+
 # Функция понадобится при внедрении зависимостей
 async def get_elastic() -> Optional[AsyncElasticsearch]:
     return es
+
+
+@asynccontextmanager
+async def aclosing(generator: AsyncGenerator) -> AsyncIterator[AsyncGenerator]:
+    # contextlib.aclosing появился только в Python 3.10
+    try:
+        yield generator
+    finally:
+        await generator.aclose()
+
+
+async def search_all(
+    elastic: AsyncElasticsearch,
+    index: str,
+    body: dict,
+    batch_size: int = SEARCH_ALL_BATCH_SIZE,
+) -> AsyncGenerator[dict, None]:
+    """
+    Все документы, подходящие под запрос, без ограничения size, по одному
+    _source. Первая страница читается обычным поиском, и если она неполная,
+    на этом всё. Иначе открывается point in time, и остальные страницы
+    читаются через него с search_after, начиная после последнего документа
+    первой страницы; в памяти одновременно не больше batch_size документов.
+    Порядок — sort из body (он должен быть однозначным) или по id.
+
+    Пока открыт point in time, генератор нужно закрывать явно, не дожидаясь
+    сборщика мусора: async with aclosing(search_all(...)) as documents.
+    """
+    body = {**body, "sort": body.get("sort", [{"id": "asc"}])}
+    response = await elastic.search(index=index, body=body, size=batch_size)
+    hits = response.body["hits"]["hits"]
+    for hit in hits:
+        yield hit["_source"]
+    if len(hits) < batch_size:
+        return
+
+    pit = await elastic.open_point_in_time(
+        index=index, keep_alive=SEARCH_ALL_KEEP_ALIVE
+    )
+    pit_id = pit["id"]
+    # Значения sort страниц point in time включают неявный _shard_doc.
+    # sort однозначен, поэтому с наибольшим _shard_doc после значений
+    # последнего документа первой страницы идут ровно следующие документы,
+    # даже если между запросами что-то добавили или удалили
+    search_after = [*hits[-1]["sort"], MAX_SHARD_DOC]
+    try:
+        while True:
+            page = {
+                **body,
+                "pit": {"id": pit_id, "keep_alive": SEARCH_ALL_KEEP_ALIVE},
+                "search_after": search_after,
+            }
+
+            response = await elastic.search(body=page, size=batch_size)
+            pit_id = response.body.get("pit_id", pit_id)
+            hits = response.body["hits"]["hits"]
+            for hit in hits:
+                yield hit["_source"]
+
+            if len(hits) < batch_size:
+                return
+            search_after = hits[-1]["sort"]
+    finally:
+        await elastic.close_point_in_time(id=pit_id)
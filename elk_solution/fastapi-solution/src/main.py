@@ -1,3 +1,4 @@
+import asyncio
 import logging
 
 import sentry_sdk
@@ -8,10 +9,14 @@ from fastapi.responses import ORJSONResponse
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.redis import RedisBackend
 from redis.asyncio import Redis
+from src.api.cache import ResponseCoder
 from src.api.v1 import films, genres, persons, service
 from src.core.config import settings
-from src.core.logger import LOGGING
+from src.core.logger import LOGGING, logger
+from src.core.metrics import MetricsMiddleware
 from src.db import elastic, redis_db
+from src.services import auth, cache
+from src.services.genre import genre_index
 
 sentry_sdk.init(
     dsn=settings.sentry_dsn,
@@ -31,17 +36,42 @@ app = FastAPI(
     openapi_url="/api/openapi.json",
     default_response_class=ORJSONResponse,
 )
+app.add_middleware(MetricsMiddleware)
 
 
 @app.on_event("startup")
 async def startup():
     redis_db.redis_client = Redis(host=settings.redis_host, port=settings.redis_port)
-    elastic.es = AsyncElasticsearch(hosts=[f"http://{settings.elastic_connect}"])
-    FastAPICache.init(RedisBackend(redis_db.redis_client), prefix="fastapi-cache")
+    elastic.es = AsyncElasticsearch(
+        hosts=[f"http://{settings.elastic_connect}"],
+        transport_class=elastic.MetricsTransport,
+    )
+    FastAPICache.init(
+        RedisBackend(redis_db.redis_client),
+        prefix="fastapi-cache",
+        coder=ResponseCoder,
+    )
+    app.state.cache_invalidation = asyncio.create_task(
+        cache.listen_for_invalidations(redis_db.redis_client)
+    )
+    try:
+        await genre_index.refresh(elastic.es)
+    except Exception:
+        logger.warning("FastAPISolution - Genre index is not loaded", exc_info=True)
+    app.state.genre_index_refresh = asyncio.create_task(
+        genre_index.keep_fresh(elastic.es)
+    )
+    app.state.blacklist_filter_refresh = asyncio.create_task(
+        auth.blacklist_filter.keep_fresh(redis_db.redis_client)
+    )
 
 
 @app.on_event("shutdown")
 async def shutdown():
+    app.state.cache_invalidation.cancel()
+    app.state.genre_index_refresh.cancel()
+    app.state.blacklist_filter_refresh.cancel()
+    await auth.close_auth_session()
     await redis_db.redis_client.close()
     await elastic.es.close()
 
@@ -23,6 +23,16 @@ class Film(BaseModel, OrjsonMixin):
     imdb_rating: float
 
 
+# Поля, которые нужны спискам фильмов: остальное из ES не запрашивается
+FILM_LIST_FIELDS = list(Film.model_fields)
+
+
+def film_from_source(source: dict) -> Film:
+    # Документы индекса movies пишет наш ETL по той же схеме, поэтому
+    # для списков модель собирается без повторной валидации
+    return Film.model_construct(**source)
+
+
 class FilmFull(Film):
     description: Optional[str]
     genres: List[Dict[str, str]]
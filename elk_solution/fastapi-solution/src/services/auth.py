@@ -1,17 +1,73 @@
+import asyncio
+import hashlib
+import hmac
 import http
 import time
 from typing import List, Optional
 
 import aiohttp
 import jwt
-from aiohttp.client_exceptions import ClientConnectionError
+from aiohttp.client_exceptions import ClientError
 from fastapi import HTTPException, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from prometheus_client import Counter
 from pydantic import BaseModel
+from redis.asyncio import Redis
 from redis.exceptions import ConnectionError
 from src.core.config import settings
 from src.core.logger import logger
+from src.core.metrics import CallbackMetric
 from src.db.redis_db import get_redis
+from src.services import cache
+from src.services.bloom import BloomFilter
+from src.services.cache import LocalCache
+from src.services.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+
+# Сессия с пулом соединений к сервису авторизации на весь процесс
+auth_session: Optional[aiohttp.ClientSession] = None
+
+# Ключ отозванного токена в Redis: BLACKLIST_KEY_PREFIX + token_id(token).
+# Записи старого формата, сделанные до перехода на token_id, лежат под
+# самим токеном и проверяются, пока не истекут
+BLACKLIST_KEY_PREFIX = "blacklist:"
+LEGACY_BLACKLIST_KEY_MATCH = "eyJ*"
+
+# Решения сервиса авторизации и проверки чёрного списка по token_id.
+# Отзыв токена публикует в канал инвалидации кэша (INVALIDATION_CHANNEL)
+# ключ "auth:<token_id>" или "*", и запись удаляется во всех воркерах.
+verification_cache = LocalCache(settings.auth_cache_size, settings.auth_cache_ttl)
+blacklist_cache = LocalCache(settings.auth_cache_size, settings.auth_cache_ttl)
+
+# Пока сервис авторизации недоступен или отвечает медленно, токены
+# проверяются локально: подпись и чёрный список
+auth_breaker = CircuitBreaker(
+    "auth_service",
+    failure_threshold=settings.auth_breaker_failure_threshold,
+    slow_call_duration=settings.auth_breaker_slow_call_duration,
+    reset_timeout=settings.auth_breaker_reset_timeout,
+)
+
+auth_service_requests_total = Counter(
+    "auth_service_requests_total",
+    "Token checks against the auth service by result",
+    ("result",),
+)
+CallbackMetric(
+    "auth_circuit_breaker_state",
+    "Auth service circuit breaker state (1 for the current one)",
+    "gauge",
+    ("state",),
+    lambda: {
+        (state,): int(auth_breaker.state == state)
+        for state in (CLOSED, OPEN, HALF_OPEN)
+    },
+)
 
 
 class TokenData(BaseModel):
@@ -35,25 +91,153 @@ def decode_token(token: str) -> Optional[dict]:
         return None
 
 
+def token_id(token: str) -> str:
+    """
+    Идентификатор токена для чёрного списка и кэшей: jti, если он есть,
+    иначе sha256 токена. Подпись здесь не проверяется, её проверяет
+    decode_token на каждом запросе.
+    """
+    try:
+        jti = jwt.decode(token, options={"verify_signature": False}).get("jti")
+    except jwt.InvalidTokenError:
+        jti = None
+    return str(jti) if jti else hashlib.sha256(token.encode()).hexdigest()
+
+
+class BlacklistFilter:
+    """
+    Фильтр Блума по token_id отозванных токенов. Почти все проверки
+    чёрного списка отрицательные, и при BLACKLIST_LEGACY_KEYS=False фильтр
+    отвечает на них без Redis; возможные совпадения подтверждаются в Redis.
+    Фильтр перестраивается по ключам BLACKLIST_KEY_PREFIX и старым
+    ключам-токенам раз в BLACKLIST_FILTER_REFRESH_INTERVAL, а отозванные
+    между перестройками токены добавляются по сообщениям из канала
+    инвалидации.
+    """
+
+    def __init__(self):
+        self.bloom: Optional[BloomFilter] = None
+        self._rebuild_added: Optional[set] = None
+        self._changed: Optional[asyncio.Event] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.bloom is not None
+
+    def might_contain(self, item: str) -> bool:
+        return self.bloom is None or item in self.bloom
+
+    def add(self, item: str):
+        if self.bloom is not None:
+            self.bloom.add(item)
+        if self._rebuild_added is not None:
+            self._rebuild_added.add(item)
+
+    def on_invalidate(self, key: str):
+        if key == "*":
+            # Сообщения могли потеряться — фильтр нужно перестроить
+            if self._changed:
+                self._changed.set()
+        elif key.startswith("auth:"):
+            self.add(key.split(":", 1)[1])
+
+    async def refresh(self, redis: Redis):
+        self._rebuild_added = set()
+        try:
+            items = [
+                key.decode().split(":", 1)[1]
+                async for key in redis.scan_iter(
+                    match=BLACKLIST_KEY_PREFIX + "*", count=1000
+                )
+            ]
+            items += [
+                token_id(key.decode())
+                async for key in redis.scan_iter(
+                    match=LEGACY_BLACKLIST_KEY_MATCH, count=1000
+                )
+            ]
+            bloom = BloomFilter(
+                max(settings.blacklist_filter_capacity, len(items) * 2),
+                settings.blacklist_filter_error_rate,
+            )
+            for item in [*items, *self._rebuild_added]:
+                bloom.add(item)
+        finally:
+            self._rebuild_added = None
+        self.bloom = bloom
+
+    async def keep_fresh(self, redis: Redis):
+        self._changed = asyncio.Event()
+        while True:
+            try:
+                await self.refresh(redis)
+            except Exception:
+                logger.warning(
+                    "FastAPISolution - Unable to refresh blacklist filter",
+                    exc_info=True,
+                )
+            try:
+                await asyncio.wait_for(
+                    self._changed.wait(), settings.blacklist_filter_refresh_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._changed.clear()
+
+
+blacklist_filter = BlacklistFilter()
+
+
+def on_invalidate(key: str):
+    if key == "*":
+        verification_cache.invalidate(key)
+        blacklist_cache.invalidate(key)
+    elif key.startswith("auth:"):
+        _, revoked_id = key.split(":", 1)
+        verification_cache.invalidate(revoked_id)
+        blacklist_cache.invalidate(revoked_id)
+
+
+cache.invalidation_handlers.append(on_invalidate)
+cache.invalidation_handlers.append(blacklist_filter.on_invalidate)
+
+
+def get_auth_session() -> aiohttp.ClientSession:
+    global auth_session
+    if auth_session is None or auth_session.closed:
+        auth_session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=settings.auth_service_timeout)
+        )
+    return auth_session
+
+
+async def close_auth_session():
+    if auth_session is not None:
+        await auth_session.close()
+
+
 async def verify_user_data(token: str) -> bool:
     url = f"http://{settings.auth_service_host}:{settings.auth_service_port}/api/v1/users/check_access_token"
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            url, json=AccessTokenEncripted(token=token).model_dump()
-        ) as response:
-            if response.status == 200:
-                user_data = await response.json()
-                if user_data is True:
-                    return True
+    async with get_auth_session().post(
+        url, json=AccessTokenEncripted(token=token).model_dump()
+    ) as response:
+        # Ошибка сервиса — не ответ о токене: проверка уйдёт в локальный режим
+        if response.status >= 500:
+            response.raise_for_status()
+        if response.status == 200:
+            user_data = await response.json()
+            if user_data is True:
+                return True
 
     return False
 
 
 async def is_blacklisted(token: str) -> Optional[bool]:
+    # Один EXISTS по ключу token_id и по ключу старого формата
     redis = await get_redis()
-    exists = await redis.exists(token)
-    if exists == 1:
+    exists = await redis.exists(BLACKLIST_KEY_PREFIX + token_id(token), token)
+    if exists > 0:
         return True
     return False
 
@@ -99,23 +283,56 @@ class JWTBearer(HTTPBearer):
         return decoded_token
 
     async def verify_token(self, token: str) -> Optional[bool]:
+        # None — токен не проверен сервисом авторизации: дальше проверяются
+        # подпись и чёрный список. В локальном режиме сервис не вызывается.
+        if settings.auth_verification_mode == "local":
+            return None
+
+        key = token_id(token)
+        verified = verification_cache.get(key)
+        if verified is not None:
+            auth_service_requests_total.labels("cached").inc()
+            return verified
+
         try:
-            return await verify_user_data(token)
-        except ClientConnectionError:
+            verified = await auth_breaker.call(lambda: verify_user_data(token))
+        except CircuitOpenError:
+            auth_service_requests_total.labels("circuit_open").inc()
+            return None
+        except (ClientError, asyncio.TimeoutError):
+            auth_service_requests_total.labels("error").inc()
             logger.warning(
                 "FastAPISolution - Unable to verify with auth service, continuing without verification."
             )
             return None
 
+        auth_service_requests_total.labels("verified" if verified else "rejected").inc()
+        verification_cache.put(key, verified)
+        return verified
+
     async def check_black_list(self, token: str) -> Optional[bool]:
+        key = token_id(token)
+        # Отрицательному ответу фильтра можно верить, только если все отзывы
+        # публикуются в канал инвалидации (см. BLACKLIST_LEGACY_KEYS)
+        filter_is_complete = not settings.blacklist_legacy_keys
+        if filter_is_complete and not blacklist_filter.might_contain(key):
+            return False
+
+        blacklisted = blacklist_cache.get(key)
+        if blacklisted is not None:
+            return blacklisted
+
         try:
-            return await is_blacklisted(token)
+            blacklisted = await is_blacklisted(token)
         except ConnectionError:
             logger.warning(
                 "FastAPISolution - Unable to check blacklist, continuing without checking."
             )
             return None
 
+        blacklist_cache.put(key, blacklisted)
+        return blacklisted
+
     @staticmethod
     def parse_token(jwt_token: str) -> Optional[dict]:
         return decode_token(jwt_token)
@@ -139,6 +356,21 @@ class JWTBearerWithRoles(JWTBearer):
         return any(role in user_roles for role in self.roles)
 
 
+async def require_internal_token(request: Request):
+    # Служебные маршруты не зависят от AUTH_CHECK_IS_ON: их закрывает
+    # отдельный токен, а не пользовательский JWT
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    expected = settings.internal_api_token
+    if (
+        not expected
+        or scheme != "Bearer"
+        or not hmac.compare_digest(token.encode(), expected.encode())
+    ):
+        raise HTTPException(
+            status_code=http.HTTPStatus.FORBIDDEN, detail="Internal endpoint."
+        )
+
+
 if settings.auth_check_is_on:
     security_jwt = JWTBearer()
 
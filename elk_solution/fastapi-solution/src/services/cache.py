@@ -0,0 +1,311 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, TypeVar
+
+from pydantic import TypeAdapter
+from redis.asyncio import Redis
+from redis.exceptions import ConnectionError, LockError
+from src.core.config import settings
+from src.core.metrics import CallbackMetric
+from src.core.logger import logger
+from src.services.coalescing import single_flight
+from src.services.codec import codec
+from src.settings import ENTITY_CACHE_VERSION
+
+T = TypeVar("T")
+
+# Канал, в который публикуются ключи устаревших записей ("*" — сбросить всё)
+INVALIDATION_CHANNEL = "entity_cache:invalidate"
+INVALIDATION_RECONNECT_DELAY = 1  # секунд
+
+
+class CacheStats:
+    def __init__(self):
+        self.local_hits = 0
+        self.hits = 0
+        self.misses = 0
+
+    def snapshot(self) -> dict:
+        requests = self.local_hits + self.hits + self.misses
+        return {
+            "local_hits": self.local_hits,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (
+                round((self.local_hits + self.hits) / requests, 3) if requests else None
+            ),
+        }
+
+
+# Статистика общая для всех экземпляров сервисов: FilmService создаёт
+# собственные GenreService и PersonService, а считать нужно по сущности.
+cache_stats: Dict[str, CacheStats] = {}
+
+CallbackMetric(
+    "entity_cache_requests_total",
+    "Entity cache lookups by result",
+    "counter",
+    ("entity", "result"),
+    lambda: {
+        (entity, result): getattr(stats, counter)
+        for entity, stats in cache_stats.items()
+        for result, counter in (
+            ("local_hit", "local_hits"),
+            ("hit", "hits"),
+            ("miss", "misses"),
+        )
+    },
+)
+
+
+class LocalCache:
+    """
+    LRU-кэш процесса перед Redis. Хранит уже провалидированные объекты,
+    поэтому возвращённые из кэша модели нельзя изменять на месте.
+    Запись живёт не дольше ttl секунд, раньше её удаляет сообщение
+    в INVALIDATION_CHANNEL.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: str):
+        if key == "*":
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+local_cache = (
+    LocalCache(settings.local_cache_size, settings.local_cache_ttl)
+    if settings.local_cache_enabled
+    else None
+)
+
+# Другие кэши процесса, которые нужно сбрасывать по сообщениям
+# из INVALIDATION_CHANNEL, получают ключ (или "*") через эти обработчики
+invalidation_handlers: List[Callable[[str], None]] = []
+
+
+def invalidate_local(key: str):
+    if local_cache is not None:
+        local_cache.invalidate(key)
+    for handler in invalidation_handlers:
+        handler(key)
+
+
+class EntityCache(Generic[T]):
+    """
+    Кэш сущностей: LocalCache процесса, за ним Redis. Ключ выводится только
+    из названия сущности, версии схемы и идентификатора: "film:v1:<id>".
+    При несовместимом изменении моделей достаточно поднять
+    ENTITY_CACHE_VERSION, и старые записи перестанут читаться и истекут сами.
+    """
+
+    def __init__(self, redis: Redis, entity: str, model: Any, expire: int):
+        self.redis = redis
+        self.entity = entity
+        self.adapter: TypeAdapter = TypeAdapter(model)
+        self.expire = expire
+        self.stats = cache_stats.setdefault(entity, CacheStats())
+
+    def key(self, entity_id: str) -> str:
+        return f"{self.entity}:v{ENTITY_CACHE_VERSION}:{entity_id}"
+
+    async def get(self, entity_id: str) -> Optional[T]:
+        key = self.key(entity_id)
+        if local_cache is not None:
+            value = local_cache.get(key)
+            if value is not None:
+                self.stats.local_hits += 1
+                return value
+
+        value = await self._get_from_redis(key)
+        if value is None:
+            self.stats.misses += 1
+            return None
+
+        self.stats.hits += 1
+        return value
+
+    async def get_many(self, entity_ids: List[str]) -> Dict[str, T]:
+        """
+        Найденные в кэше значения по идентификаторам. Всё, чего нет
+        в LocalCache, читается из Redis одним MGET.
+        """
+        found: Dict[str, T] = {}
+        missing: Dict[str, str] = {}
+        for entity_id in entity_ids:
+            key = self.key(entity_id)
+            value = local_cache.get(key) if local_cache is not None else None
+            if value is not None:
+                self.stats.local_hits += 1
+                found[entity_id] = value
+            else:
+                missing[key] = entity_id
+
+        if not missing:
+            return found
+
+        for key, data in zip(missing, await self.redis.mget(list(missing))):
+            if not data:
+                self.stats.misses += 1
+                continue
+
+            value = self._decode(key, data)
+            if value is None:
+                self.stats.misses += 1
+                continue
+
+            self.stats.hits += 1
+            found[missing[key]] = value
+        return found
+
+    async def get_or_load(
+        self, entity_id: str, load: Callable[[], Awaitable[Optional[T]]]
+    ) -> Optional[T]:
+        """
+        Значение из кэша, а при промахе — из load с записью в кэш.
+        Одновременные промахи по одному ключу в воркере выполняют load
+        один раз (SingleFlight), с COALESCING_REDIS_LOCK — один раз на все
+        воркеры, пока держится блокировка в Redis.
+        """
+        value = await self.get(entity_id)
+        if value is not None:
+            return value
+
+        return await single_flight.do(
+            self.entity, entity_id, lambda: self._load(entity_id, load)
+        )
+
+    async def _load(
+        self, entity_id: str, load: Callable[[], Awaitable[Optional[T]]]
+    ) -> Optional[T]:
+        if not settings.coalescing_redis_lock:
+            return await self._load_and_put(entity_id, load)
+
+        key = self.key(entity_id)
+        lock = self.redis.lock(
+            "lock:" + key,
+            timeout=settings.coalescing_lock_timeout,
+            blocking_timeout=settings.coalescing_lock_wait,
+        )
+        # Не дождавшись блокировки, воркер загружает значение сам
+        acquired = await lock.acquire()
+        try:
+            # Пока ждали блокировку, значение мог загрузить другой воркер
+            value = await self._get_from_redis(key)
+            if value is None:
+                value = await self._load_and_put(entity_id, load)
+            return value
+        finally:
+            if acquired:
+                try:
+                    await lock.release()
+                except LockError:
+                    pass
+
+    async def _load_and_put(
+        self, entity_id: str, load: Callable[[], Awaitable[Optional[T]]]
+    ) -> Optional[T]:
+        value = await load()
+        if value:
+            await self.put(entity_id, value)
+        return value
+
+    async def put(self, entity_id: str, value: T):
+        key = self.key(entity_id)
+        await self.redis.set(key, codec.dumps(self.adapter, value), self.expire)
+        if local_cache is not None:
+            local_cache.put(key, value)
+
+    async def put_many(self, values: Dict[str, T]):
+        # Все записи уходят в Redis одним пайплайном SET EX
+        if not values:
+            return
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for entity_id, value in values.items():
+                pipe.set(
+                    self.key(entity_id), codec.dumps(self.adapter, value), self.expire
+                )
+            await pipe.execute()
+
+        if local_cache is not None:
+            for entity_id, value in values.items():
+                local_cache.put(self.key(entity_id), value)
+
+    async def _get_from_redis(self, key: str) -> Optional[T]:
+        data = await self.redis.get(key)
+        if not data:
+            return None
+
+        return self._decode(key, data)
+
+    def _decode(self, key: str, data: bytes) -> Optional[T]:
+        try:
+            value = codec.loads(self.adapter, data)
+        except ValueError:
+            # Запись в другом формате (сменили CACHE_CODEC) считается промахом
+            logger.warning(f"Unable to decode cache key '{key}'", exc_info=True)
+            return None
+
+        if local_cache is not None:
+            local_cache.put(key, value)
+        return value
+
+    async def invalidate(self, entity_id: str):
+        # Удаляет запись из Redis и из LocalCache всех воркеров
+        key = self.key(entity_id)
+        await self.redis.delete(key)
+        await self.redis.publish(INVALIDATION_CHANNEL, key)
+        invalidate_local(key)
+
+
+async def listen_for_invalidations(redis: Redis):
+    """
+    Фоновая задача воркера: удаляет из LocalCache ключи, пришедшие
+    в INVALIDATION_CHANNEL. Пока подписки нет, сообщения теряются,
+    поэтому после переподключения LocalCache сбрасывается целиком.
+    """
+    if local_cache is None and not invalidation_handlers:
+        return
+
+    while True:
+        try:
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                invalidate_local("*")
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        invalidate_local(message["data"].decode())
+        except ConnectionError:
+            logger.warning(
+                "FastAPISolution - Lost cache invalidation subscription, reconnecting."
+            )
+            invalidate_local("*")
+            await asyncio.sleep(INVALIDATION_RECONNECT_DELAY)
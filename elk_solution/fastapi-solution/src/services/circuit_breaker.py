@@ -0,0 +1,107 @@
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Размыкатель для вызовов внешнего сервиса. После failure_threshold
+    неудач подряд (ошибка или вызов дольше slow_call_duration секунд)
+    цепь размыкается, и вызовы сразу получают CircuitOpenError.
+    Через reset_timeout секунд пропускается один пробный вызов: успех
+    замыкает цепь, неудача размыкает её снова.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        slow_call_duration: float,
+        reset_timeout: float,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_duration = slow_call_duration
+        self.reset_timeout = reset_timeout
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.rejected = 0
+        self.opened = 0
+
+    async def call(self, func: Callable[[], Awaitable[T]]) -> T:
+        if not self._allow():
+            self.rejected += 1
+            raise CircuitOpenError(self.name)
+
+        self.calls += 1
+        probe = self.state == HALF_OPEN
+        self._probing = probe
+        start = time.monotonic()
+        try:
+            result = await func()
+        except Exception:
+            self.failures += 1
+            self._on_failure()
+            raise
+        finally:
+            if probe:
+                self._probing = False
+
+        if time.monotonic() - start > self.slow_call_duration:
+            # Медленный ответ используется, но считается неудачей
+            self.slow_calls += 1
+            self._on_failure()
+        else:
+            self._on_success()
+        return result
+
+    def _allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:  # type: ignore
+                return False
+            self.state = HALF_OPEN
+        return not self._probing
+
+    def _on_success(self):
+        self.state = CLOSED
+        self.consecutive_failures = 0
+
+    def _on_failure(self):
+        self.consecutive_failures += 1
+        if (
+            self.state == HALF_OPEN
+            or self.consecutive_failures >= self.failure_threshold
+        ):
+            if self.state != OPEN:
+                self.opened += 1
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "calls": self.calls,
+            "failures": self.failures,
+            "slow_calls": self.slow_calls,
+            "rejected": self.rejected,
+            "opened": self.opened,
+        }
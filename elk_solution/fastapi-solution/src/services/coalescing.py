@@ -0,0 +1,44 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class CoalescingStats:
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+
+    def snapshot(self) -> dict:
+        return {"calls": self.calls, "coalesced": self.coalesced}
+
+
+class SingleFlight:
+    """
+    Склейка одновременных запросов: пока загрузка по ключу не завершилась,
+    остальные вызовы с тем же ключом ждут её результат, а не повторяют
+    запрос в Elasticsearch. Загрузка идёт отдельной задачей, поэтому отмена
+    первого запроса (клиент отключился) не отменяет её для остальных.
+    """
+
+    def __init__(self):
+        self.stats: Dict[str, CoalescingStats] = {}
+        self._calls: Dict[str, asyncio.Task] = {}
+
+    async def do(self, namespace: str, key: str, load: Callable[[], Awaitable[T]]) -> T:
+        stats = self.stats.setdefault(namespace, CoalescingStats())
+        stats.calls += 1
+        call_key = f"{namespace}:{key}"
+
+        task = self._calls.get(call_key)
+        if task is not None:
+            stats.coalesced += 1
+        else:
+            task = asyncio.ensure_future(load())
+            self._calls[call_key] = task
+            task.add_done_callback(lambda _: self._calls.pop(call_key, None))
+
+        return await asyncio.shield(task)
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,126 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import orjson
+from pydantic import TypeAdapter
+from src.core.config import settings
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - необязательная зависимость
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - необязательная зависимость
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:  # pragma: no cover - необязательная зависимость
+    lz4 = None
+
+# Первый байт записи: как сжато остальное
+RAW = b"0"
+ZSTD = b"z"
+LZ4 = b"l"
+
+COMPRESSION_MARKERS = {"zstd": ZSTD, "lz4": LZ4}
+
+
+def _compressors() -> Dict[bytes, Tuple[Callable, Callable]]:
+    compressors: Dict[bytes, Tuple[Callable, Callable]] = {}
+    if zstandard is not None:
+        compressors[ZSTD] = (
+            zstandard.ZstdCompressor().compress,
+            zstandard.ZstdDecompressor().decompress,
+        )
+    if lz4 is not None:
+        compressors[LZ4] = (lz4.frame.compress, lz4.frame.decompress)
+    return compressors
+
+
+class CacheCodec:
+    """
+    Сериализация значений кэша в Redis. Значение сначала приводится
+    к JSON-совместимому виду через TypeAdapter модели, затем кодируется
+    в выбранный формат:
+
+    - json — сериализатор pydantic-core (dump_json / validate_json);
+    - orjson — orjson поверх dump_python(mode="json");
+    - msgpack — то же в бинарном msgpack, меньше по размеру.
+
+    Записи не короче compression_min_size байт сжимаются zstd или lz4.
+    Перед данными пишется байт с видом сжатия, поэтому читаются и записи,
+    сделанные с другой настройкой сжатия.
+    """
+
+    def __init__(
+        self,
+        fmt: str = "json",
+        compression: Optional[str] = None,
+        compression_min_size: int = 1024,
+    ):
+        if fmt not in ("json", "orjson", "msgpack"):
+            raise ValueError(f"Unknown cache codec format: {fmt}")
+        if fmt == "msgpack" and msgpack is None:
+            raise ValueError("Cache codec format msgpack requires msgpack package")
+
+        self.compressors = _compressors()
+        self.marker = RAW
+        if compression:
+            if compression not in COMPRESSION_MARKERS:
+                raise ValueError(f"Unknown cache compression: {compression}")
+            self.marker = COMPRESSION_MARKERS[compression]
+            if self.marker not in self.compressors:
+                raise ValueError(
+                    f"Cache compression {compression} requires "
+                    f"{'zstandard' if self.marker == ZSTD else 'lz4'} package"
+                )
+
+        self.fmt = fmt
+        self.compression_min_size = compression_min_size
+
+    def dumps(self, adapter: TypeAdapter, value: Any) -> bytes:
+        if self.fmt == "json":
+            data = adapter.dump_json(value)
+        elif self.fmt == "orjson":
+            data = orjson.dumps(adapter.dump_python(value, mode="json"))
+        else:
+            data = msgpack.packb(adapter.dump_python(value, mode="json"))
+
+        if self.marker == RAW or len(data) < self.compression_min_size:
+            return RAW + data
+
+        compress, _ = self.compressors[self.marker]
+        return self.marker + compress(data)
+
+    def loads(self, adapter: TypeAdapter, data: bytes) -> Any:
+        """
+        Любая испорченная или чужая запись даёт ValueError: zstandard
+        и lz4 бросают свои исключения, а вызывающий код считает
+        промахом только ValueError.
+        """
+        marker, data = data[:1], data[1:]
+        if marker != RAW and marker not in self.compressors:
+            raise ValueError(f"Unsupported cache compression marker: {marker!r}")
+        try:
+            if marker != RAW:
+                _, decompress = self.compressors[marker]
+                data = decompress(data)
+
+            if self.fmt == "json":
+                return adapter.validate_json(data)
+            if self.fmt == "orjson":
+                return adapter.validate_python(orjson.loads(data))
+            return adapter.validate_python(msgpack.unpackb(data))
+        except ValueError:
+            raise
+        except Exception as error:
+            raise ValueError(f"Unable to decode cache entry: {error!r}") from error
+
+
+codec = CacheCodec(
+    settings.cache_codec,
+    settings.cache_compression,
+    settings.cache_compression_min_size,
+)
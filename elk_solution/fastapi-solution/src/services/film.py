@@ -1,34 +1,73 @@
+import base64
+import binascii
+import hashlib
 from functools import lru_cache
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
+import orjson
 from elasticsearch import AsyncElasticsearch, NotFoundError
 from fastapi import Depends
 from redis.asyncio import Redis
-from slugify import slugify
-from src.db.elastic import get_elastic
+from src.db.elastic import (  # noqa: F401
+    MAX_RESULT_WINDOW,
+    PageTooDeepError,
+    get_elastic,
+)
 from src.db.redis_db import get_redis
-from src.models.film import Film, FilmFull
+from src.models.film import FILM_LIST_FIELDS, Film, FilmFull, film_from_source
+from src.services.cache import EntityCache
+from src.services.coalescing import single_flight
 from src.services.genre import GenreService
 from src.services.person import PersonService
 
 FILM_CACHE_EXPIRE_IN_SECONDS = 60 * 5  # 5 минут
 
 
+class InvalidCursorError(Exception):
+    pass
+
+
+def query_key(body: dict) -> str:
+    # Курсор действителен только для того запроса и сортировки,
+    # по которым он выдан: search_after другого запроса молча
+    # вернул бы не ту страницу
+    digest = hashlib.sha256(orjson.dumps(body, option=orjson.OPT_SORT_KEYS))
+    return digest.hexdigest()[:16]
+
+
+def encode_cursor(search_after: list, key: str) -> str:
+    return base64.urlsafe_b64encode(
+        orjson.dumps({"k": key, "a": search_after})
+    ).decode()
+
+
+def decode_cursor(cursor: str, key: str) -> list:
+    try:
+        position = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        raise InvalidCursorError
+    if not isinstance(position, dict) or position.get("k") != key:
+        raise InvalidCursorError
+    search_after = position.get("a")
+    if not isinstance(search_after, list) or not search_after:
+        raise InvalidCursorError
+    return search_after
+
+
 class FilmService:
     def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
         self.redis: Redis = redis
         self.elastic: AsyncElasticsearch = elastic
+        self.cache: EntityCache[FilmFull] = EntityCache(
+            redis, "film", FilmFull, FILM_CACHE_EXPIRE_IN_SECONDS
+        )
         self.genre_service = GenreService(redis, elastic)
         self.person_service = PersonService(redis, elastic)
 
     async def get_by_id(self, film_id: str) -> Optional[FilmFull]:
-        film: Optional[FilmFull] = await self._film_from_cache(film_id)
-        if not film:
-            film = await self._get_film_from_elastic(film_id)
-            if not film:
-                return None
-            await self._put_film_to_cache(film)
-        return film
+        return await self.cache.get_or_load(
+            film_id, lambda: self._get_film_from_elastic(film_id)
+        )
 
     async def _get_film_from_elastic(self, film_id: str) -> Optional[FilmFull]:
         try:
@@ -45,21 +84,6 @@ class FilmService:
             return None
         return FilmFull(**doc)  # type: ignore
 
-    async def _film_from_cache(self, film_id: str) -> Optional[FilmFull]:
-        data = await self.redis.get(film_id)
-        if not data:
-            return None
-
-        film = FilmFull.model_validate_json(data)
-        return film
-
-    async def _put_film_to_cache(self, film: FilmFull):
-        await self.redis.set(
-            "film_" + slugify(film.title) + "_" + film.id,
-            film.model_dump_json(),
-            FILM_CACHE_EXPIRE_IN_SECONDS,
-        )
-
     async def get_popular_films(
         self,
         sort_param: Optional[str],
@@ -67,8 +91,9 @@ class FilmService:
         genre_filter: Optional[str],
         page_size: int,
         page_number: int,
-    ) -> List[Film]:
-        body: dict = {"query": {"match_all": {}}}
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Film], Optional[str]]:
+        body: dict = {"query": {"match_all": {}}, "sort": ["_score"]}
         if sort_param:
             body["sort"] = [{sort_param: {"order": "desc" if descending else "asc"}}]
         if genre_filter:
@@ -76,29 +101,63 @@ class FilmService:
             if genre:
                 body["query"] = {"bool": {"filter": [{"term": {"genres": genre.name}}]}}
 
-        return await self.elastic_search(body, page_number, page_size)
+        return await self.elastic_search(body, page_number, page_size, cursor)
 
     async def search_films(
-        self, query: str, page_number: int, page_size: int
-    ) -> List[Film]:
+        self, query: str, page_number: int, page_size: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Film], Optional[str]]:
         body: dict = {
             "query": {"match": {"title": {"query": query, "fuzziness": "AUTO"}}},
             "sort": ["_score"],
         }
 
-        return await self.elastic_search(body, page_number, page_size)
+        return await self.elastic_search(body, page_number, page_size, cursor)
 
     async def elastic_search(
-        self, body: dict, page_number: int, page_size: int
-    ) -> List[Film]:
+        self,
+        body: dict,
+        page_number: int,
+        page_size: int,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Film], Optional[str]]:
+        """
+        Страница фильмов и курсор следующей страницы. С курсором страница
+        читается через search_after, и page_number не учитывается; без него —
+        через from/size, что допустимо только в пределах MAX_RESULT_WINDOW.
+        """
+        # id — последний ключ сортировки, чтобы порядок был однозначным
+        # и search_after не пропускал фильмы с равными значениями
+        body = {**body, "sort": [*body["sort"], {"id": "asc"}]}
+        cursor_key = query_key(body)
+        if cursor is not None:
+            body["search_after"] = decode_cursor(cursor, cursor_key)
+            page_number = 1
+        elif page_number * page_size > MAX_RESULT_WINDOW:
+            raise PageTooDeepError
+
+        key = orjson.dumps(
+            [body, page_number, page_size], option=orjson.OPT_SORT_KEYS
+        ).decode()
+        return await single_flight.do(
+            "film_search",
+            key,
+            lambda: self._search(body, page_number, page_size, cursor_key),
+        )
+
+    async def _search(
+        self, body: dict, page_number: int, page_size: int, cursor_key: str
+    ) -> Tuple[List[Film], Optional[str]]:
         results = await self.elastic.search(
             index="movies",
-            body=body,
+            body={**body, "_source": FILM_LIST_FIELDS},
             from_=(page_number - 1) * page_size,
             size=page_size,
         )
         films_json = results.body["hits"]["hits"]
-        return [Film(**film["_source"]) for film in films_json]
+        next_cursor = None
+        if len(films_json) == page_size:
+            next_cursor = encode_cursor(films_json[-1]["sort"], cursor_key)
+        return [film_from_source(film["_source"]) for film in films_json], next_cursor
 
 
 @lru_cache()
@@ -1,31 +1,87 @@
+import asyncio
 from functools import lru_cache
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional
 
 from elastic_transport import ObjectApiResponse
 from elasticsearch import AsyncElasticsearch, NotFoundError
 from fastapi import Depends
 from redis.asyncio import Redis
-from slugify import slugify
+from src.core.config import settings
+from src.core.logger import logger
 from src.db.elastic import get_elastic
 from src.db.redis_db import get_redis
 from src.models.genre import Genre
+from src.services import cache
+from src.services.cache import EntityCache
 
 GENRE_CACHE_EXPIRE_IN_SECONDS = 60 * 5  # 5 минут
 
 
+class GenreIndex:
+    """
+    Все жанры в памяти процесса, по id и по названию. Индекс жанров
+    маленький и меняется редко, поэтому загружается целиком при старте
+    и перечитывается раз в GENRE_INDEX_REFRESH_INTERVAL или сразу после
+    сообщения об изменении жанра в канале инвалидации кэша.
+    """
+
+    def __init__(self):
+        self.by_id: Dict[str, Genre] = {}
+        self.by_name: Dict[str, Genre] = {}
+        self.loaded = False
+        self._changed: Optional[asyncio.Event] = None
+
+    def update(self, genres: List[Genre]):
+        self.by_id = {genre.id: genre for genre in genres}
+        self.by_name = {genre.name: genre for genre in genres}
+        self.loaded = True
+
+    def on_invalidate(self, key: str):
+        if self._changed and (key == "*" or key.startswith("genre:")):
+            self._changed.set()
+
+    async def refresh(self, elastic: AsyncElasticsearch):
+        self.update(await get_all_genres_from_elastic(elastic) or [])
+        logger.info(f"FastAPISolution - Genre index loaded: {len(self.by_id)} genres")
+
+    async def keep_fresh(self, elastic: AsyncElasticsearch):
+        self._changed = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._changed.wait(), settings.genre_index_refresh_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._changed.clear()
+            try:
+                await self.refresh(elastic)
+            except Exception:
+                logger.warning(
+                    "FastAPISolution - Unable to refresh genre index", exc_info=True
+                )
+
+
+genre_index = GenreIndex()
+cache.invalidation_handlers.append(genre_index.on_invalidate)
+
+
 class GenreService:
     def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
         self.redis: Redis = redis
         self.elastic: AsyncElasticsearch = elastic
+        self.cache: EntityCache[Genre] = EntityCache(
+            redis, "genre", Genre, GENRE_CACHE_EXPIRE_IN_SECONDS
+        )
 
     async def get_by_id(self, genre_id: str) -> Optional[Genre]:
-        genre: Optional[Genre] = await self._genre_from_cache(genre_id)
-        if not genre:
-            genre = await self._get_genre_from_elastic(genre_id)
-            if not genre:
-                return None
-            await self._put_genre_to_cache(genre)
-        return genre
+        genre = genre_index.by_id.get(genre_id)
+        if genre:
+            return genre
+
+        return await self.cache.get_or_load(
+            genre_id, lambda: self._get_genre_from_elastic(genre_id)
+        )
 
     async def _get_genre_from_elastic(self, genre_id: str) -> Optional[Genre]:
         try:
@@ -36,54 +92,55 @@ class GenreService:
             return None
         return Genre(**doc["_source"])
 
-    async def _genre_from_cache(self, genre_id: str) -> Optional[Genre]:
-        data = await self.redis.get(genre_id)
-        if not data:
-            return None
-
-        genre = Genre.model_validate_json(data)
-        return genre
-
-    async def _put_genre_to_cache(self, genre: Genre):
-        await self.redis.set(
-            "genre_" + slugify(genre.name) + "_" + genre.id,
-            genre.model_dump_json(),
-            GENRE_CACHE_EXPIRE_IN_SECONDS,
-        )
-
     async def get_all_genres(self) -> Optional[Genre]:
-        genres = await self._get_all_genres_from_elastic()
+        if genre_index.loaded:
+            return list(genre_index.by_id.values()) or None  # type: ignore
+
+        genres = await get_all_genres_from_elastic(self.elastic)
         if not genres:
             return None
 
         return genres
 
     async def exact_search_by_full_name(self, genres: List[str]):
-        dsl_query = {"query": {"terms": {"name": genres}}}
+        # Повторы в запросе не должны давать повторов в ответе
+        genres = list(dict.fromkeys(genres))
+        # Жанр, которого ещё нет в индексе, ищется в Elasticsearch
+        if genre_index.loaded and all(name in genre_index.by_name for name in genres):
+            return [genre_index.by_name[name] for name in genres]
+
+        dsl_query = {"query": {"terms": {"name": genres}}, "size": len(genres)}
 
         search_result = await self.elastic.search(
             index="genres",
             body=dsl_query,
         )
 
-        genres = search_result.body["hits"]["hits"]
-        return [Genre(**genre["_source"]) for genre in genres]  # type: ignore
+        found = [
+            Genre(**genre["_source"]) for genre in search_result.body["hits"]["hits"]
+        ]
+        # Найденные жанры сразу кладутся в кэш для get_by_id одним пайплайном
+        await self.cache.put_many({genre.id: genre for genre in found})
+        return found
 
-    async def _get_all_genres_from_elastic(self):
-        try:
-            docs: ObjectApiResponse[Any] = await self.elastic.search(  # type: ignore
-                index="genres", size=1000
-            )
-            docs = list(
-                map(
-                    lambda doc: Genre(**doc["_source"]),
-                    [doc for doc in docs["hits"]["hits"]],
-                )
+
+async def get_all_genres_from_elastic(
+    elastic: AsyncElasticsearch,
+) -> Optional[List[Genre]]:
+    try:
+        docs: ObjectApiResponse[Any] = await elastic.search(  # type: ignore
+            index="genres", size=1000
+        )
+        docs = list(
+            map(
+                lambda doc: Genre(**doc["_source"]),
+                [doc for doc in docs["hits"]["hits"]],
             )
-        except NotFoundError:
-            return None
+        )
+    except NotFoundError:
+        return None
 
-        return docs
+    return docs
 
 
 @lru_cache()
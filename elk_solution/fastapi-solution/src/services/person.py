@@ -1,4 +1,3 @@
-import pickle
 from functools import lru_cache
 from typing import Any, Dict, List, Optional, Union
 from uuid import UUID
@@ -7,19 +6,67 @@ from elastic_transport import ObjectApiResponse
 from elasticsearch import AsyncElasticsearch, NotFoundError
 from fastapi import Depends
 from redis.asyncio import Redis
-from slugify import slugify
-from src.db.elastic import get_elastic
+from src.db.elastic import (
+    MAX_RESULT_WINDOW,
+    PageTooDeepError,
+    aclosing,
+    get_elastic,
+    search_all,
+)
 from src.db.redis_db import get_redis
-from src.models.film import Film
+from src.models.film import FILM_LIST_FIELDS, Film, film_from_source
 from src.models.person import Person
+from src.services.cache import EntityCache
+from src.services.coalescing import single_flight
 
 PERSON_CACHE_EXPIRE_IN_SECONDS = 60 * 5  # 5 минут
 
+ROLE_FIELDS = {"directors": "director", "actors": "actor", "writers": "writer"}
+
+
+def person_film_roles(
+    films: List[dict], person_ids: List[str]
+) -> Dict[str, List[Dict[str, Union[UUID, List[str]]]]]:
+    """
+    Роли персон в фильмах за один проход по участникам каждого фильма:
+    {person_id: [{"uuid": film_id, "roles": [...]}]} в порядке фильмов.
+    """
+    wanted = set(person_ids)
+    films_by_person: Dict[str, List[Dict[str, Union[UUID, List[str]]]]] = {}
+    for film in films:
+        add_film_roles(films_by_person, film, wanted)
+    return films_by_person
+
+
+def add_film_roles(
+    films_by_person: Dict[str, List[Dict[str, Union[UUID, List[str]]]]],
+    film: dict,
+    wanted: set,
+):
+    film_roles: Dict[str, set] = {}
+    for role_field, role_name in ROLE_FIELDS.items():
+        for person in film.get(role_field) or []:
+            if person["id"] in wanted:
+                film_roles.setdefault(person["id"], set()).add(role_name)
+
+    if film_roles:
+        film_id = UUID(film["id"])
+        for person_id, roles in film_roles.items():
+            films_by_person.setdefault(person_id, []).append(
+                {"uuid": film_id, "roles": sorted(roles)}
+            )
+
 
 class PersonService:
     def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
         self.redis: Redis = redis
         self.elastic: AsyncElasticsearch = elastic
+        self.cache: EntityCache[Person] = EntityCache(
+            redis, "person", Person, PERSON_CACHE_EXPIRE_IN_SECONDS
+        )
+        self.films_cache: EntityCache[List[Film]] = EntityCache(
+            redis, "person_films", List[Film], PERSON_CACHE_EXPIRE_IN_SECONDS
+        )
 
     def _get_query_for_person_films(self, person_ids: List[str]) -> dict:
         return {
@@ -50,13 +97,9 @@ class PersonService:
         }
 
     async def get_by_id(self, person_id: str) -> Optional[Person]:
-        person: Optional[Person] = await self._person_from_cache(person_id)
-        if not person:
-            person = await self._get_person_from_elastic(person_id)
-            if not person:
-                return None
-            await self._put_person_to_cache(person)
-        return person
+        return await self.cache.get_or_load(
+            person_id, lambda: self._get_person_from_elastic(person_id)
+        )
 
     async def _get_person_from_elastic(self, person_id: str) -> Optional[Person]:
         try:
@@ -67,10 +110,9 @@ class PersonService:
             person_films = await self._get_person_film_roles_from_elastic(
                 [person_id],
             )
-            [film.pop("person_id", None) for film in person_films]
 
             data: dict = doc["_source"]
-            data["films"] = person_films
+            data["films"] = person_films.get(person_id, [])
 
         except NotFoundError:
             return None
@@ -78,112 +120,73 @@ class PersonService:
 
     async def _get_person_film_roles_from_elastic(
         self, person_ids: List[str]
-    ) -> List[Dict[str, Union[UUID, List[str]]]]:
-        try:
-            dsl_query = self._get_query_for_person_films(person_ids)
+    ) -> Dict[str, List[Dict[str, Union[UUID, List[str]]]]]:
+        if not person_ids:
+            return {}
 
-            films_response: ObjectApiResponse[Any] = await self.elastic.search(
-                index="movies",
-                body=dsl_query,
-                size=1000,
-            )
-
-            films_list: List[dict] = [
-                film["_source"] for film in films_response.body["hits"]["hits"]
-            ]
-
-            films_field: List[Dict[str, Union[UUID, List[str]]]] = []
-            for film in films_list:
-                for person_id in person_ids:
-                    roles = []
-                    role_fields: dict[str, str] = {
-                        "directors": "director",
-                        "actors": "actor",
-                        "writers": "writer",
-                    }
-
-                    for role_field, role_name in role_fields.items():
-                        ids: set = {person["id"] for person in film[role_field]}
-                        if person_id in ids:
-                            roles.append(role_name)
-
-                    if roles:
-                        films_field.append(
-                            {
-                                "person_id": UUID(person_id),
-                                "uuid": UUID(film["id"]),
-                                "roles": sorted(roles),
-                            }
-                        )
+        dsl_query = self._get_query_for_person_films(person_ids)
+        # Для ролей нужны только идентификаторы фильма и участников
+        dsl_query["_source"] = ["id", *(f"{field}.id" for field in ROLE_FIELDS)]
 
+        wanted = set(person_ids)
+        films_by_person: Dict[str, List[Dict[str, Union[UUID, List[str]]]]] = {}
+        try:
+            async with aclosing(search_all(self.elastic, "movies", dsl_query)) as films:
+                async for film in films:
+                    add_film_roles(films_by_person, film, wanted)
         except NotFoundError:
-            return []
-        return films_field
-
-    async def _person_from_cache(self, person_id: str) -> Optional[Person]:
-        data = await self.redis.get(person_id)
-        if not data:
-            return None
-
-        person: Person = Person.model_validate_json(data)
-        return person
-
-    async def _put_person_to_cache(self, person: Person):
-        await self.redis.set(
-            "person_" + slugify(person.full_name) + "_" + person.id,
-            person.model_dump_json(),
-            PERSON_CACHE_EXPIRE_IN_SECONDS,
-        )
+            return {}
+        return films_by_person
 
     async def get_films_by_person_id(
-        self,
-        person_id: str,
+        self, person_id: str, page_number: int, page_size: int
     ) -> Optional[Union[list, List[Film]]]:
-        films = await self._person_films_from_cache(person_id)
-        if not films:
-            films = await self._get_person_films_from_elastic(person_id)
-            if not films:
-                return []
-
-        await self._put_person_films_to_cache(person_id, films)
-        return films
+        if page_number * page_size > MAX_RESULT_WINDOW:
+            raise PageTooDeepError
+        films = await self.films_cache.get_or_load(
+            f"{person_id}:{page_number}:{page_size}",
+            lambda: self._get_person_films_from_elastic(
+                person_id, page_number, page_size
+            ),
+        )
+        return films or []
 
     async def _get_person_films_from_elastic(
-        self, person_id: str
+        self, person_id: str, page_number: int, page_size: int
     ) -> Union[list, List[Film]]:
         try:
-            dsl_query = self._get_query_for_person_films(
-                [
-                    person_id,
-                ]
-            )
+            dsl_query = self._get_query_for_person_films([person_id])
+            dsl_query["_source"] = FILM_LIST_FIELDS
+            # id разбивает равный _score, иначе страницы from/size могут
+            # повторять и пропускать фильмы, как и в списках фильмов
+            dsl_query["sort"] = ["_score", {"id": "asc"}]
             films_response: ObjectApiResponse[Any] = await self.elastic.search(
-                index="movies", body=dsl_query, size=1000
+                index="movies",
+                body=dsl_query,
+                from_=(page_number - 1) * page_size,
+                size=page_size,
             )
             films_list: List[Film] = [
-                Film(**film["_source"]) for film in films_response.body["hits"]["hits"]
+                film_from_source(film["_source"])
+                for film in films_response.body["hits"]["hits"]
             ]
 
         except NotFoundError:
             return []
         return films_list
 
-    async def _person_films_from_cache(self, person_id: str):
-        data: bytes = await self.redis.get(person_id + "_films")  # type: ignore
-        if not data:
-            return None
-
-        films_data: list = pickle.loads(data)
-        return films_data
-
-    async def _put_person_films_to_cache(
-        self, person_id: str, films: Union[list, List[dict]]
-    ):
-        await self.redis.set(
-            person_id + "_films", pickle.dumps(films), PERSON_CACHE_EXPIRE_IN_SECONDS
+    async def search_by_full_name(
+        self, query: str, page_number: int, page_size: int
+    ) -> Union[list, List[Person]]:
+        if page_number * page_size > MAX_RESULT_WINDOW:
+            raise PageTooDeepError
+        return await single_flight.do(
+            "person_search",
+            f"{page_number}:{page_size}:{query}",
+            lambda: self._search_by_full_name(query, page_number, page_size),
         )
 
-    async def search_by_full_name(
+    async def _search_by_full_name(
         self, query: str, page_number: int, page_size: int
     ) -> Union[list, List[Person]]:
         must_queries = []
@@ -201,45 +204,38 @@ class PersonService:
         )
 
         persons_data = search_result.body["hits"]["hits"]
+        person_ids: List[str] = [person["_source"]["id"] for person in persons_data]
+        persons_from_cache = await self.cache.get_many(person_ids)
 
-        persons: Union[list, List[Person]] = []
-        person_ids_to_get_film_roles: Union[list, List[str]] = []
-
+        # Порядок персон — по _score, как в ответе Elasticsearch
+        persons: List[Person] = []
+        person_ids_to_get_film_roles: List[str] = []
         for person in persons_data:
-            person_id: str = person["_source"]["id"]
-
-            person_from_cache: Optional[Person] = await self._person_from_cache(
-                person_id
-            )
-            if not person_from_cache:
-                person_source = person["_source"]
+            person_source = person["_source"]
+            person_from_cache = persons_from_cache.get(person_source["id"])
+            if person_from_cache:
+                persons.append(person_from_cache)
+                continue
 
-                person_obj = Person(
+            persons.append(
+                Person(
                     id=person_source["id"],
                     full_name=person_source["full_name"],
                     films=None,
                 )
+            )
+            person_ids_to_get_film_roles.append(person_source["id"])
 
-                # append to persons to keep _score-based ordering of persons
-                persons.append(person_obj)
-                person_ids_to_get_film_roles.append(person_obj.id)
-            else:
-                persons.append(person_from_cache)
-
-        person_films = await self._get_person_film_roles_from_elastic(
+        films_dict = await self._get_person_film_roles_from_elastic(
             person_ids_to_get_film_roles
         )
 
-        films_dict: Dict[str, List[Dict[str, Union[UUID, List[str]]]]] = {}
-        for film in person_films:
-            films_dict.setdefault(str(film["person_id"]), []).append(
-                {"uuid": film["uuid"], "roles": film["roles"]}
-            )
-
+        persons_to_cache: Dict[str, Person] = {}
         for person in persons:
             if person.films is None:
                 person.films = films_dict.get(person.id, [])
-                await self._put_person_to_cache(person)
+                persons_to_cache[person.id] = person
+        await self.cache.put_many(persons_to_cache)
 
         return persons
 
@@ -1,2 +1,24 @@
 # CACHED_RESPONSE_TTL = 1
 CACHED_RESPONSE_TTL = 60 * 5
+# Сколько ещё отдавать устаревший ответ, пока он обновляется в фоне
+STALE_RESPONSE_GRACE = 60 * 5
+
+# Кэш ответов по маршрутам (src.api.cache): (soft, hard) TTL в секундах.
+# soft == hard отключает stale-while-revalidate для маршрута.
+DEFAULT_RESPONSE_TTL = (CACHED_RESPONSE_TTL, CACHED_RESPONSE_TTL + STALE_RESPONSE_GRACE)
+RESPONSE_CACHE_TTL = {
+    "films_search": DEFAULT_RESPONSE_TTL,
+    "film_details": DEFAULT_RESPONSE_TTL,
+    "popular_films": DEFAULT_RESPONSE_TTL,
+    "genre_list": DEFAULT_RESPONSE_TTL,
+    "genre_details": DEFAULT_RESPONSE_TTL,
+    "person_search": DEFAULT_RESPONSE_TTL,
+    "person_details": DEFAULT_RESPONSE_TTL,
+    "person_films": DEFAULT_RESPONSE_TTL,
+}
+# Заголовки ответа, которые кэшируются вместе с телом
+CACHED_RESPONSE_HEADERS = ("X-Next-Cursor",)
+
+# Версия схемы ключей кэша сущностей (src.services.cache), поднимается
+# при несовместимом изменении моделей
+ENTITY_CACHE_VERSION = 2
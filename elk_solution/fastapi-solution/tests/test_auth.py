@@ -0,0 +1,107 @@
+# tests/test_auth.py
+
+import fnmatch
+import time
+
+import jwt
+import pytest
+from src.db import redis_db
+from src.services import auth
+from src.services.cache import LocalCache
+
+
+class FakeRedis:
+    # Только то, что нужно проверке чёрного списка: EXISTS и SCAN
+    def __init__(self, keys):
+        self.keys = set(keys)
+        self.exists_calls = 0
+
+    async def exists(self, *names):
+        self.exists_calls += 1
+        return sum(name in self.keys for name in names)
+
+    async def scan_iter(self, match, count=None):
+        for key in self.keys:
+            if fnmatch.fnmatchcase(key, match):
+                yield key.encode()
+
+
+def make_token(**claims):
+    # Подпись чёрный список не проверяет
+    return jwt.encode(
+        {"sub": "kimkanovsky", "exp": int(time.time()) + 3600, **claims},
+        "secret",
+        algorithm="HS256",
+    )
+
+
+def blacklist_keys(token, key_format):
+    if key_format == "token_id":
+        return [auth.BLACKLIST_KEY_PREFIX + auth.token_id(token)]
+    return [token]
+
+
+@pytest.fixture
+def blacklist(monkeypatch):
+    monkeypatch.setattr(auth, "blacklist_filter", auth.BlacklistFilter())
+    monkeypatch.setattr(auth, "blacklist_cache", LocalCache(10, 60))
+
+    def use_redis(keys):
+        redis = FakeRedis(keys)
+        monkeypatch.setattr(redis_db, "redis_client", redis)
+        return redis
+
+    return use_redis
+
+
+@pytest.mark.parametrize("key_format", ["token_id", "legacy"])
+@pytest.mark.parametrize("claims", [{"jti": "a3f1c2"}, {}])
+@pytest.mark.asyncio
+async def test_revoked_token(blacklist, key_format, claims):
+    token = make_token(**claims)
+    blacklist(blacklist_keys(token, key_format))
+
+    assert await auth.JWTBearer().check_black_list(token) is True
+    assert await auth.JWTBearer().check_black_list(make_token(jti="b7d9e4")) is False
+
+
+@pytest.mark.parametrize("key_format", ["token_id", "legacy"])
+@pytest.mark.asyncio
+async def test_filter_refresh(blacklist, key_format):
+    token = make_token(jti="a3f1c2")
+    redis = blacklist(blacklist_keys(token, key_format))
+
+    await auth.blacklist_filter.refresh(redis)
+
+    assert auth.blacklist_filter.might_contain(auth.token_id(token))
+    assert not auth.blacklist_filter.might_contain(auth.token_id(make_token()))
+    assert await auth.JWTBearer().check_black_list(token) is True
+
+
+@pytest.mark.parametrize("key_format", ["token_id", "legacy"])
+@pytest.mark.asyncio
+async def test_revoked_after_filter_load(blacklist, key_format):
+    # Сервис авторизации пишет отзыв в Redis и ничего не публикует
+    token = make_token(jti="a3f1c2")
+    redis = blacklist([])
+    await auth.blacklist_filter.refresh(redis)
+
+    redis.keys.update(blacklist_keys(token, key_format))
+
+    assert await auth.JWTBearer().check_black_list(token) is True
+
+
+@pytest.mark.asyncio
+async def test_published_revocation_after_filter_load(blacklist, monkeypatch):
+    monkeypatch.setattr(auth.settings, "blacklist_legacy_keys", False)
+    token = make_token(jti="a3f1c2")
+    redis = blacklist([])
+    await auth.blacklist_filter.refresh(redis)
+
+    redis.keys.update(blacklist_keys(token, "token_id"))
+    auth.blacklist_filter.on_invalidate("auth:" + auth.token_id(token))
+
+    assert await auth.JWTBearer().check_black_list(token) is True
+    exists_calls = redis.exists_calls
+    assert await auth.JWTBearer().check_black_list(make_token(jti="b7d9e4")) is False
+    assert redis.exists_calls == exists_calls
@@ -1,34 +1,41 @@
 from http import HTTPStatus
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 
 from app import models, schemas
-from app.crud import (
-    add_bookmark,
-    add_like,
-    add_review,
-    delete_bookmark,
-    delete_like,
-    delete_review,
-    edit_review,
-    get_movie_likes,
-    get_user_bookmarks,
-    get_user_likes,
-)
 from app.database import get_database
 from app.service_functions import security_jwt
+from app.storage import crud
+from app.write_buffer import WriteBufferFull, get_write_buffer
 
 router = APIRouter()
 
 
+async def buffer_write(write_buffer, operations: dict, response: Response):
+    try:
+        await write_buffer.put(operations)
+    except WriteBufferFull:
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE, detail="Write buffer is full"
+        )
+    response.status_code = HTTPStatus.ACCEPTED
+
+
 @router.post("/movies/like")
 async def like_movie(
     like: schemas.Like,
+    response: Response,
     db=Depends(get_database),
+    write_buffer=Depends(get_write_buffer),
     user: dict = Depends(security_jwt),
 ):
+    if write_buffer:
+        operations = crud.like_operations(like.movie_id, user["user_id"], like.rating)
+        await buffer_write(write_buffer, operations, response)
+        return {"message": "Like added"}
 
-    result = await add_like(db, like.movie_id, user["user_id"], like.rating)
+    result = await crud.add_like(db, like.movie_id, user["user_id"], like.rating)
     if not result:
         raise HTTPException(
             status_code=HTTPStatus.CONFLICT, detail="Movie is aleady liked"
@@ -42,7 +49,7 @@ async def unlike_movie(
     db=Depends(get_database),
     user: dict = Depends(security_jwt),
 ):
-    result = await delete_like(db, movie_id, user["user_id"])
+    result = await crud.delete_like(db, movie_id, user["user_id"])
     if not result:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Like not found")
     return {"message": "Like deleted"}
@@ -51,13 +58,20 @@ async def unlike_movie(
 @router.post("/movies/review")
 async def review_movie(
     review: schemas.Review,
+    response: Response,
     db=Depends(get_database),
+    write_buffer=Depends(get_write_buffer),
     user: dict = Depends(security_jwt),
 ):
 
     model_review = models.Review(**review.model_dump() | {"user_id": user["user_id"]})
 
-    result = await add_review(db, review.movie_id, model_review)
+    if write_buffer:
+        operations = crud.review_operations(review.movie_id, model_review)
+        await buffer_write(write_buffer, operations, response)
+        return {"message": "Review added"}
+
+    result = await crud.add_review(db, review.movie_id, model_review)
     if not result:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Movie not found")
     return {"message": "Review added"}
@@ -75,7 +89,9 @@ async def update_review(
         **updated_review.model_dump() | {"user_id": user["user_id"]}
     )
 
-    result = await edit_review(db, updated_review.movie_id, review_id, model_review)
+    result = await crud.edit_review(
+        db, updated_review.movie_id, review_id, model_review
+    )
     if not result:
         raise HTTPException(status_code=404, detail="Review or movie not found")
     return {"message": "Review updated"}
@@ -88,7 +104,7 @@ async def remove_review(
     db=Depends(get_database),
     user: dict = Depends(security_jwt),
 ):
-    result = await delete_review(db, movie_id, review_id)
+    result = await crud.delete_review(db, movie_id, review_id)
     if not result:
         raise HTTPException(status_code=404, detail="Review or movie not found")
     return {"message": "Review deleted"}
@@ -97,10 +113,17 @@ async def remove_review(
 @router.post("/users/bookmark")
 async def bookmark_movie(
     bookmark: schemas.Bookmark,
+    response: Response,
     db=Depends(get_database),
+    write_buffer=Depends(get_write_buffer),
     user: dict = Depends(security_jwt),
 ):
-    result = await add_bookmark(db, user["user_id"], bookmark.movie_id)
+    if write_buffer:
+        operations = crud.bookmark_operations(user["user_id"], bookmark.movie_id)
+        await buffer_write(write_buffer, operations, response)
+        return {"message": "Movie bookmarked"}
+
+    result = await crud.add_bookmark(db, user["user_id"], bookmark.movie_id)
     if not result:
         raise HTTPException(
             status_code=HTTPStatus.CONFLICT, detail="Already bookmarked"
@@ -114,7 +137,7 @@ async def remove_bookmark(
     db=Depends(get_database),
     user: dict = Depends(security_jwt),
 ):
-    result = await delete_bookmark(db, user["user_id"], movie_id)
+    result = await crud.delete_bookmark(db, user["user_id"], movie_id)
     if not result:
         raise HTTPException(status_code=404, detail="Bookmark not found")
     return {"message": "Bookmark deleted"}
@@ -124,19 +147,59 @@ async def remove_bookmark(
 async def get_likes(
     movie_id: str, db=Depends(get_database), user: dict = Depends(security_jwt)
 ):
-    likes = await get_movie_likes(db, movie_id)
+    likes = await crud.get_movie_likes(db, movie_id)
     return likes
 
 
+@router.post("/movies/likes")
+async def get_likes_batch(
+    movies: schemas.MoviesBatch,
+    db=Depends(get_database),
+    user: dict = Depends(security_jwt),
+):
+    likes_count = await crud.get_movies_likes(db, movies.movie_ids)
+    return {"likes_count": likes_count}
+
+
+@router.get("/movies/{movie_id}/rating")
+async def get_rating(
+    movie_id: str, db=Depends(get_database), user: dict = Depends(security_jwt)
+):
+    rating = await crud.get_movie_rating(db, movie_id)
+    return rating
+
+
 @router.get("/users/me/bookmarks")
 async def get_my_bookmarks(
-    db=Depends(get_database), user: dict = Depends(security_jwt)
+    limit: int = Query(50, description="Pagination page size", ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Pagination cursor"),
+    count_only: bool = Query(False, description="Return only bookmarks count"),
+    db=Depends(get_database),
+    user: dict = Depends(security_jwt),
 ):
-    bookmarks = await get_user_bookmarks(db, user["user_id"])
+    if count_only:
+        return await crud.count_user_bookmarks(db, user["user_id"])
+
+    try:
+        bookmarks = await crud.get_user_bookmarks(db, user["user_id"], limit, cursor)
+    except crud.InvalidCursorError:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="Invalid cursor")
     return bookmarks
 
 
 @router.get("/users/me/likes")
-async def get_my_likes(db=Depends(get_database), user: dict = Depends(security_jwt)):
-    likes = await get_user_likes(db, user["user_id"])
+async def get_my_likes(
+    limit: int = Query(50, description="Pagination page size", ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Pagination cursor"),
+    count_only: bool = Query(False, description="Return only likes count"),
+    db=Depends(get_database),
+    user: dict = Depends(security_jwt),
+):
+    if count_only:
+        return await crud.count_user_likes(db, user["user_id"])
+
+    try:
+        likes = await crud.get_user_likes(db, user["user_id"], limit, cursor)
+    except crud.InvalidCursorError:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="Invalid cursor")
     return likes
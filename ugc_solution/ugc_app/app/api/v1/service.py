@@ -1,8 +1,12 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Response, status
 from fastapi.responses import JSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
+from app import service_functions
+from app.core.config import settings
+from app.database import pool_stats
 from app.service_functions import security_jwt
 
 router = APIRouter()
@@ -24,3 +28,43 @@ async def perform_healthcheck_w_auth(
     Healthcheck endpoint
     """
     return JSONResponse(content={"status": "UP", "user": user})
+
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics() -> Response:
+    """
+    Process metrics in the Prometheus text format
+    """
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@router.get("/internal/token_cache", status_code=status.HTTP_200_OK)
+async def token_cache_stats() -> JSONResponse:
+    """
+    JWT cache counters
+    """
+    token_cache = service_functions.token_cache
+    if token_cache is None:
+        return JSONResponse(content={"enabled": False})
+    return JSONResponse(
+        content={
+            "enabled": True,
+            "size": len(token_cache),
+            "hits": token_cache.hits,
+            "misses": token_cache.misses,
+        }
+    )
+
+
+@router.get("/internal/mongo_pool", status_code=status.HTTP_200_OK)
+async def mongo_pool_stats() -> JSONResponse:
+    """
+    Motor connection pool counters
+    """
+    return JSONResponse(
+        content={
+            "max_pool_size": settings.mongo_max_pool_size,
+            "min_pool_size": settings.mongo_min_pool_size,
+        }
+        | pool_stats.snapshot()
+    )
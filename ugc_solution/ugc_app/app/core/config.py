@@ -1,5 +1,6 @@
 import os
 from logging import config as logging_config
+from typing import Literal, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -22,9 +23,36 @@ class Settings(BaseSettings):
 
     secret_key: str = Field(None, alias="SECRET_KEY")
     algorithm: str = Field(None, alias="ALGORITHM")
+    # Кэш раскодированных JWT
+    jwt_cache_enabled: bool = Field(True, alias="JWT_CACHE_ENABLED")
+    jwt_cache_size: int = Field(10000, alias="JWT_CACHE_SIZE")
 
     mongo_connect: str = Field(None, alias="MONGO_CONNECT")
     mongo_db_name: str = Field(None, alias="MONGO_DB_NAME")
+    # Пул соединений Motor, размеры задаются на один воркер
+    mongo_max_pool_size: int = Field(100, alias="MONGO_MAX_POOL_SIZE")
+    mongo_min_pool_size: int = Field(0, alias="MONGO_MIN_POOL_SIZE")
+    mongo_max_idle_time_ms: Optional[int] = Field(None, alias="MONGO_MAX_IDLE_TIME_MS")
+    mongo_wait_queue_timeout_ms: Optional[int] = Field(
+        None, alias="MONGO_WAIT_QUEUE_TIMEOUT_MS"
+    )
+    # Например "zstd,snappy,zlib"; zstd и snappy требуют отдельных пакетов
+    mongo_compressors: Optional[str] = Field(None, alias="MONGO_COMPRESSORS")
+    mongo_read_preference: str = Field("primary", alias="MONGO_READ_PREFERENCE")
+    # embedded — лайки и рецензии внутри документа фильма,
+    # collections — отдельные коллекции likes, reviews и bookmarks
+    storage_layout: Literal["embedded", "collections"] = Field(
+        "embedded", alias="STORAGE_LAYOUT"
+    )
+
+    # Буферизованная запись лайков, закладок и рецензий
+    write_buffer_enabled: bool = Field(False, alias="WRITE_BUFFER_ENABLED")
+    write_buffer_flush_interval_ms: int = Field(
+        50, alias="WRITE_BUFFER_FLUSH_INTERVAL_MS"
+    )
+    write_buffer_max_batch_size: int = Field(500, alias="WRITE_BUFFER_MAX_BATCH_SIZE")
+    write_buffer_max_queue_size: int = Field(10000, alias="WRITE_BUFFER_MAX_QUEUE_SIZE")
+    write_buffer_put_timeout_ms: int = Field(1000, alias="WRITE_BUFFER_PUT_TIMEOUT_MS")
 
 
 settings = Settings()
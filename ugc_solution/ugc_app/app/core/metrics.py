@@ -0,0 +1,94 @@
+import time
+from typing import Callable, Dict, Sequence, Tuple
+
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+# Метрики процесса в текстовом формате Prometheus (GET /metrics).
+# Каждый воркер отдаёт свои значения, Prometheus собирает их по отдельности.
+
+METRIC_FAMILIES = {"counter": CounterMetricFamily, "gauge": GaugeMetricFamily}
+
+
+class CallbackMetric(Collector):
+    """
+    Метрика, значения которой читаются при сборе из уже существующих
+    счётчиков (TokenCache, PoolStats и т.п.), чтобы не считать их второй раз.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        type: str,
+        labelnames: Sequence[str],
+        collect: Callable[[], Dict[Tuple[str, ...], float]],
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.family = METRIC_FAMILIES[type]
+        self.labelnames = tuple(labelnames)
+        self._collect = collect
+        REGISTRY.register(self)
+
+    def describe(self):
+        # Без describe реестр вызвал бы collect ещё при импорте модуля
+        return [self.family(self.name, self.documentation, labels=self.labelnames)]
+
+    def collect(self):
+        family = self.family(self.name, self.documentation, labels=self.labelnames)
+        for labels, value in self._collect().items():
+            family.add_metric(labels, value)
+        return [family]
+
+
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "HTTP requests being processed"
+)
+http_requests_total = Counter(
+    "http_requests_total", "HTTP requests", ("method", "route", "status")
+)
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ("method", "route"),
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: время ответа по шаблону маршрута
+    ("/api/v1/movies/{movie_id}/like"), а не по фактическому пути,
+    чтобы число рядов не росло с числом фильмов и пользователей.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            # Маршрут в scope кладёт роутер FastAPI после сопоставления
+            route = scope.get("route")
+            path = route.path if route is not None else "<unmatched>"
+            http_request_duration_seconds.labels(scope["method"], path).observe(
+                time.perf_counter() - start
+            )
+            http_requests_total.labels(scope["method"], path, str(status)).inc()
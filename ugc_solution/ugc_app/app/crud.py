@@ -1,63 +1,81 @@
+import base64
 import uuid
 
-from app import models
-
-
-async def add_like(db, movie_id, user_id, rating):
-    is_already_liked = await db.movies.find_one(
-        {"movie_id": movie_id, f"likes.{user_id}": {"$exists": True}}
-    )
-    if is_already_liked:
-        return False
+from pymongo import IndexModel
+from pymongo.errors import DuplicateKeyError
 
-    if not await _movie_exists(db, movie_id):
-        await _add_movie(db, movie_id)
+from app import models
+from app.schemas import RATINGS
 
-    if not await _user_exists(db, user_id):
-        await _add_user(db, user_id)
+# На уникальных индексах держится защита от дублей в upsert-запросах.
+# Если в базе уже есть дубли movie_id или user_id, индексы не соберутся:
+# перед запуском их нужно слить скриптом scripts.dedupe_documents.
+INDEXES = {
+    "movies": [IndexModel("movie_id", unique=True)],
+    "users": [IndexModel("user_id", unique=True)],
+}
 
-    result = await db.movies.update_one(
-        {"movie_id": movie_id, f"likes.{user_id}": {"$exists": False}},
-        {"$set": {f"likes.{user_id}": rating}, "$inc": {"likes_count": 1}},
-    )
+# Сколько удалений перед последним выданным элементом переживает курсор
+# страниц в массивах пользователя (закладки и лайки)
+PAGE_LOOKBACK = 100
 
-    if result.modified_count > 0:
-        await db.users.update_one(
-            {"user_id": user_id},
-            {"$set": {f"likes.{movie_id}": rating}},
-        )
 
+async def add_like(db, movie_id, user_id, rating):
+    # Дубль-проверка, создание документа фильма и инкремент счётчика —
+    # один атомарный upsert. Если лайк уже есть, фильтр не совпадает,
+    # upsert пытается вставить второй документ с тем же movie_id и
+    # получает DuplicateKeyError от уникального индекса.
+    like_filter, like_update = _movie_like_update(movie_id, user_id, rating)
+    try:
+        await db.movies.update_one(like_filter, like_update, upsert=True)
+    except DuplicateKeyError:
+        # Документ фильма мог появиться параллельно от другого пользователя,
+        # поэтому повторяем без upsert: 0 изменений означает повторный лайк.
+        result = await db.movies.update_one(like_filter, like_update)
+        if result.modified_count == 0:
+            return False
+
+    await _upsert(db.users, *_user_like_update(movie_id, user_id, rating))
     return True
 
 
 async def delete_like(db, movie_id, user_id):
-    result = await db.movies.update_one(
-        {"movie_id": movie_id, f"likes.{user_id}": {"$exists": True}},
-        {"$unset": {f"likes.{user_id}": ""}, "$inc": {"likes_count": -1}},
-    )
-
-    if result.modified_count > 0:
-        await db.users.update_one(
-            {"user_id": user_id, f"likes.{movie_id}": {"$exists": True}},
-            {"$unset": {f"likes.{movie_id}": ""}},
+    # Чтобы откатить счётчики оценок, нужна оценка лайка. Снимаем лайк
+    # только при прочитанной оценке: если её успели поменять удалением
+    # и повторным лайком, обновление не совпадёт и чтение повторится.
+    while True:
+        movie = await db.movies.find_one(
+            {"movie_id": movie_id, f"likes.{user_id}": {"$exists": True}},
+            {f"likes.{user_id}": 1},
         )
-        return True
-    else:
-        return False
-
-
-async def add_review(db, movie_id, review: models.Review):
+        if not movie:
+            return False
+
+        rating = movie["likes"][user_id]
+        result = await db.movies.update_one(
+            {"movie_id": movie_id, f"likes.{user_id}": rating},
+            {
+                "$unset": {f"likes.{user_id}": ""},
+                "$inc": rating_counters(rating, -1),
+            },
+        )
+        if result.modified_count > 0:
+            break
 
-    if not await _movie_exists(db, movie_id):
-        await _add_movie(db, movie_id)
+    await db.users.update_one(
+        {"user_id": user_id, f"likes.{movie_id}": {"$exists": True}},
+        {"$unset": {f"likes.{movie_id}": ""}},
+    )
+    return True
 
-    if not await _user_exists(db, review.user_id):
-        await _add_user(db, review.user_id)
 
-    await db.movies.update_one(
-        {"movie_id": movie_id},
-        {"$set": {f"reviews.{uuid.uuid4()}": review.model_dump()}},
-    )
+async def add_review(db, movie_id, review: models.Review):
+    # Документы фильма и пользователя создаются тем же upsert-ом,
+    # что и в буферизованной записи, поэтому параллельные запросы
+    # не вставят второй документ с тем же movie_id или user_id.
+    for collection, operations in review_operations(movie_id, review).items():
+        for query, update in operations:
+            await _upsert(db[collection], query, update)
     return True
 
 
@@ -83,20 +101,18 @@ async def delete_review(db, movie_id, review_id):
 
 
 async def add_bookmark(db, user_id, movie_id):
-    if not await _movie_exists(db, movie_id):
-        await _add_movie(db, movie_id)
-
-    if not await _user_exists(db, user_id):
-        await _add_user(db, user_id)
-
-    is_already_bookmarked = await db.users.find_one(
-        {"user_id": user_id, "bookmarks": movie_id}
+    await _upsert(
+        db.movies,
+        {"movie_id": movie_id},
+        {"$setOnInsert": {"likes": {}, "reviews": {}}},
+    )
+    # Закладка уже есть — фильтр не совпадает, и upsert упирается
+    # в уникальный индекс; повтор без upsert ничего не меняет.
+    return await _upsert(
+        db.users,
+        {"user_id": user_id, "bookmarks": {"$ne": movie_id}},
+        {"$push": {"bookmarks": movie_id}, "$setOnInsert": {"likes": {}}},
     )
-    if is_already_bookmarked:
-        return False
-
-    await db.users.update_one({"user_id": user_id}, {"$push": {"bookmarks": movie_id}})
-    return True
 
 
 async def delete_bookmark(db, user_id, movie_id):
@@ -107,42 +123,247 @@ async def delete_bookmark(db, user_id, movie_id):
 
 
 async def get_movie_likes(db, movie_id):
-    movie = await db.movies.find_one({"movie_id": movie_id}, {"likes_count": 1})
-    if movie:
-        return {"likes_count": movie.get("likes_count", 0)}
-    return {"likes_count": 0}
+    likes_count = await get_movies_likes(db, [movie_id])
+    return {"likes_count": likes_count[movie_id]}
 
 
-async def get_user_bookmarks(db, user_id):
-    user = await db.users.find_one({"user_id": user_id}, {"bookmarks": 1})
-    if user:
-        return {"bookmarks": user["bookmarks"]}
-    return {"bookmarks": []}
+async def get_movies_likes(db, movie_ids):
+    likes_count = dict.fromkeys(movie_ids, 0)
+    movies = db.movies.find(
+        {"movie_id": {"$in": list(likes_count)}},
+        {"_id": 0, "movie_id": 1, "likes_count": 1},
+    )
+    async for movie in movies:
+        likes_count[movie["movie_id"]] = movie.get("likes_count", 0)
+    return likes_count
 
 
-async def get_user_likes(db, user_id):
-    user = await db.users.find_one({"user_id": user_id}, {"likes": 1})
-    if user:
-        return {"likes": user["likes"]}
-    return {"likes": []}
+async def get_movie_rating(db, movie_id):
+    movie = await db.movies.find_one(
+        {"movie_id": movie_id},
+        {"likes_count": 1, "rating_sum": 1, "rating_count": 1, "rating_histogram": 1},
+    )
+    movie = movie or {}
+    rating_count = movie.get("rating_count", 0)
+    histogram = movie.get("rating_histogram", {})
+    return {
+        "likes_count": movie.get("likes_count", 0),
+        "rating_count": rating_count,
+        "average_rating": (
+            movie.get("rating_sum", 0) / rating_count if rating_count else None
+        ),
+        "histogram": {str(rating): histogram.get(str(rating), 0) for rating in RATINGS},
+    }
+
+
+def rating_counters(rating, delta):
+    # Счётчики лайков и оценок фильма, которые меняются вместе с лайком:
+    # по ним рейтинг и гистограмма читаются одним find_one.
+    return {
+        "likes_count": delta,
+        "rating_sum": rating * delta,
+        "rating_count": delta,
+        f"rating_histogram.{rating}": delta,
+    }
+
+
+async def get_user_bookmarks(db, user_id, limit, cursor=None):
+    offset, last = _decode_position(cursor)
+    page = await _user_page(
+        db, user_id, "$bookmarks", [], lambda item: item, offset, last, limit
+    )
+    return {
+        "bookmarks": page["items"],
+        "next_cursor": _next_position_cursor(page, page["items"], limit),
+    }
+
+
+async def get_user_likes(db, user_id, limit, cursor=None):
+    # likes — объект, поэтому для $slice он превращается в массив пар
+    # в порядке вставки ключей.
+    offset, last = _decode_position(cursor)
+    likes = {"$objectToArray": {"$ifNull": ["$likes", {}]}}
+    page = await _user_page(
+        db, user_id, likes, {}, lambda like: like["k"], offset, last, limit
+    )
+    return {
+        "likes": {like["k"]: like["v"] for like in page["items"]},
+        "next_cursor": _next_position_cursor(
+            page, [like["k"] for like in page["items"]], limit
+        ),
+    }
+
+
+async def count_user_bookmarks(db, user_id):
+    return {"count": await _user_array_size(db, user_id, "$bookmarks", [])}
+
+
+async def count_user_likes(db, user_id):
+    likes = {"$objectToArray": {"$ifNull": ["$likes", {}]}}
+    return {"count": await _user_array_size(db, user_id, likes, {})}
+
+
+class InvalidCursorError(Exception):
+    pass
+
+
+def encode_cursor(position: str) -> str:
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return base64.urlsafe_b64decode(cursor.encode()).decode()
+    except ValueError:
+        raise InvalidCursorError
+
+
+async def _user_page(db, user_id, array, default, key, offset, last, limit):
+    # Страница и общий размер массива считаются на стороне Mongo, так что
+    # в ответ уходит не больше limit + PAGE_LOOKBACK элементов. Массивы
+    # только дописываются в конец, и удаления сдвигают элемент last
+    # из курсора лишь влево, поэтому он ищется среди PAGE_LOOKBACK
+    # элементов перед прежней позицией, и страница начинается после него.
+    # Если last удалён или ушёл дальше, страница начинается с прежней
+    # позиции минус один: при одновременном удалении нескольких уже
+    # выданных элементов часть следующих может быть пропущена.
+    window_start = offset if last is None else max(offset - 1 - PAGE_LOOKBACK, 0)
+    pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$project": {"_id": 0, "array": {"$ifNull": [array, default]}}},
+        {
+            "$project": {
+                "total": {"$size": "$array"},
+                "window": {
+                    "$slice": ["$array", window_start, offset - window_start + limit]
+                },
+            }
+        },
+    ]
+    page = {"total": 0, "window": []}
+    async for page in db.users.aggregate(pipeline):
+        break
+
+    window = page["window"]
+    start = offset
+    if last is not None:
+        seen = [key(item) for item in window[: offset - window_start]]
+        start = window_start + seen.index(last) + 1 if last in seen else offset - 1
+    skip = start - window_start
+    items = window[skip:][:limit]
+    return {"start": start, "total": page["total"], "items": items}
+
+
+async def _user_array_size(db, user_id, array, default):
+    pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$project": {"_id": 0, "total": {"$size": {"$ifNull": [array, default]}}}},
+    ]
+    async for user in db.users.aggregate(pipeline):
+        return user["total"]
+    return 0
+
+
+def _decode_position(cursor):
+    # Курсор — "<позиция>:<movie_id последнего выданного элемента>"
+    if cursor is None:
+        return 0, None
+    offset, _, last = decode_cursor(cursor).partition(":")
+    if not offset.isdigit() or not last:
+        raise InvalidCursorError
+    return int(offset), last
+
+
+def _next_position_cursor(page, keys, limit):
+    end = page["start"] + limit
+    if keys and end < page["total"]:
+        return encode_cursor(f"{end}:{keys[-1]}")
+    return None
+
+
+# Операции для буферизованной записи (app.write_buffer): пары (filter, update)
+# по коллекциям, которые выполняются как upsert и идемпотентны при повторе.
+
+
+def like_operations(movie_id, user_id, rating):
+    return {
+        "movies": [_movie_like_update(movie_id, user_id, rating)],
+        "users": [_user_like_update(movie_id, user_id, rating)],
+    }
+
+
+def review_operations(movie_id, review: models.Review):
+    return {
+        "movies": [
+            (
+                {"movie_id": movie_id},
+                {
+                    "$set": {f"reviews.{uuid.uuid4()}": review.model_dump()},
+                    "$setOnInsert": {"likes": {}},
+                },
+            )
+        ],
+        "users": [
+            (
+                {"user_id": review.user_id},
+                {"$setOnInsert": {"bookmarks": [], "likes": {}}},
+            )
+        ],
+    }
+
+
+def bookmark_operations(user_id, movie_id):
+    return {
+        "movies": [
+            ({"movie_id": movie_id}, {"$setOnInsert": {"likes": {}, "reviews": {}}})
+        ],
+        "users": [
+            (
+                {"user_id": user_id},
+                {"$addToSet": {"bookmarks": movie_id}, "$setOnInsert": {"likes": {}}},
+            )
+        ],
+    }
+
+
+def _movie_like_update(movie_id, user_id, rating):
+    return (
+        {"movie_id": movie_id, f"likes.{user_id}": {"$exists": False}},
+        {
+            "$set": {f"likes.{user_id}": rating},
+            "$inc": rating_counters(rating, 1),
+            "$setOnInsert": {"reviews": {}},
+        },
+    )
 
 
-async def _add_movie(db, movie_id):
-    await db.movies.insert_one({"movie_id": movie_id, "likes": {}, "reviews": {}})
+def _user_like_update(movie_id, user_id, rating):
+    # Условие как у _movie_like_update: в буфере операции по коллекциям
+    # выполняются независимо, и повторный лайк с другой оценкой иначе
+    # перезаписал бы оценку у пользователя, оставив старую у фильма.
+    return (
+        {"user_id": user_id, f"likes.{movie_id}": {"$exists": False}},
+        {"$set": {f"likes.{movie_id}": rating}, "$setOnInsert": {"bookmarks": []}},
+    )
 
 
-async def _add_user(db, user_id):
-    await db.users.insert_one({"user_id": user_id, "bookmarks": [], "likes": {}})
+async def _upsert(collection, query, update):
+    """
+    update_one с upsert. Если документ с тем же ключом вставили
+    параллельно и upsert получил DuplicateKeyError, обновление
+    повторяется без upsert. Возвращает, изменился ли документ.
+    """
+    try:
+        result = await collection.update_one(query, update, upsert=True)
+    except DuplicateKeyError:
+        result = await collection.update_one(query, update)
+    return result.modified_count > 0 or result.upserted_id is not None
 
 
 async def _movie_exists(db, movie_id):
     return bool(await db.movies.find_one({"movie_id": movie_id}, {"_id": 1}))
 
 
-async def _user_exists(db, user_id):
-    return bool(await db.users.find_one({"user_id": user_id}, {"_id": 1}))
-
-
 async def _review_exists(db, movie_id, review_id):
     return bool(
         await db.movies.find_one(
@@ -0,0 +1,188 @@
+# Раскладка хранения STORAGE_LAYOUT=collections: лайки, рецензии и закладки
+# лежат в отдельных коллекциях по документу на пару (пользователь, фильм),
+# а в movies остаются только поддерживаемые счётчики лайков и оценок.
+# Интерфейс функций совпадает с app.crud.
+
+import uuid
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import IndexModel
+from pymongo.errors import DuplicateKeyError
+
+from app import models
+from app.crud import (  # noqa: F401
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+    get_movie_likes,
+    get_movie_rating,
+    get_movies_likes,
+    rating_counters,
+)
+
+INDEXES = {
+    "movies": [IndexModel("movie_id", unique=True)],
+    "likes": [
+        IndexModel([("user_id", 1), ("movie_id", 1)], unique=True),
+        # Выдача лайков и закладок пользователя в порядке добавления
+        IndexModel([("user_id", 1), ("_id", 1)]),
+    ],
+    "bookmarks": [
+        IndexModel([("user_id", 1), ("movie_id", 1)], unique=True),
+        IndexModel([("user_id", 1), ("_id", 1)]),
+    ],
+    "reviews": [IndexModel([("movie_id", 1), ("date", 1)])],
+}
+
+
+async def add_like(db, movie_id, user_id, rating):
+    try:
+        await db.likes.insert_one(
+            {
+                "user_id": user_id,
+                "movie_id": movie_id,
+                "rating": rating,
+                "date": datetime.now(),
+            }
+        )
+    except DuplicateKeyError:
+        return False
+
+    await db.movies.update_one(
+        *_movie_counters_update(movie_id, rating, 1), upsert=True
+    )
+    return True
+
+
+async def delete_like(db, movie_id, user_id):
+    like = await db.likes.find_one_and_delete(
+        {"user_id": user_id, "movie_id": movie_id}, {"rating": 1}
+    )
+    if not like:
+        return False
+
+    await db.movies.update_one(*_movie_counters_update(movie_id, like["rating"], -1))
+    return True
+
+
+async def add_review(db, movie_id, review: models.Review):
+    await db.reviews.insert_one(
+        {"_id": str(uuid.uuid4()), "movie_id": movie_id} | review.model_dump()
+    )
+    return True
+
+
+async def edit_review(db, movie_id, review_id, updated_review: models.Review):
+    result = await db.reviews.update_one(
+        {"_id": review_id, "movie_id": movie_id},
+        {"$set": updated_review.model_dump()},
+    )
+    return result.matched_count > 0
+
+
+async def delete_review(db, movie_id, review_id):
+    result = await db.reviews.delete_one({"_id": review_id, "movie_id": movie_id})
+    return result.deleted_count > 0
+
+
+async def add_bookmark(db, user_id, movie_id):
+    try:
+        await db.bookmarks.insert_one(
+            {"user_id": user_id, "movie_id": movie_id, "date": datetime.now()}
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def delete_bookmark(db, user_id, movie_id):
+    result = await db.bookmarks.delete_one({"user_id": user_id, "movie_id": movie_id})
+    return result.deleted_count > 0
+
+
+async def get_user_bookmarks(db, user_id, limit, cursor=None):
+    bookmarks = await _user_page(db.bookmarks, user_id, limit, cursor)
+    return {
+        "bookmarks": [bookmark["movie_id"] for bookmark in bookmarks[:limit]],
+        "next_cursor": _next_id_cursor(bookmarks, limit),
+    }
+
+
+async def get_user_likes(db, user_id, limit, cursor=None):
+    likes = await _user_page(db.likes, user_id, limit, cursor)
+    return {
+        "likes": {like["movie_id"]: like["rating"] for like in likes[:limit]},
+        "next_cursor": _next_id_cursor(likes, limit),
+    }
+
+
+async def count_user_bookmarks(db, user_id):
+    return {"count": await db.bookmarks.count_documents({"user_id": user_id})}
+
+
+async def count_user_likes(db, user_id):
+    return {"count": await db.likes.count_documents({"user_id": user_id})}
+
+
+async def _user_page(collection, user_id, limit, cursor):
+    # Пагинация по _id (порядок добавления) по индексу (user_id, _id):
+    # лишний документ в выборке показывает, что есть следующая страница.
+    query: dict = {"user_id": user_id}
+    if cursor is not None:
+        try:
+            query["_id"] = {"$gt": ObjectId(decode_cursor(cursor))}
+        except InvalidId:
+            raise InvalidCursorError
+    documents = collection.find(query, {"movie_id": 1, "rating": 1})
+    return await documents.sort("_id", 1).limit(limit + 1).to_list(length=None)
+
+
+def _next_id_cursor(documents, limit):
+    if len(documents) > limit:
+        return encode_cursor(str(documents[limit - 1]["_id"]))
+    return None
+
+
+# Операции для буферизованной записи (app.write_buffer). Третий элемент —
+# операции, которые выполняются только если upsert действительно вставил
+# документ: так счётчики не растут от повторных лайков.
+
+
+def like_operations(movie_id, user_id, rating):
+    return {
+        "likes": [
+            (
+                {"user_id": user_id, "movie_id": movie_id},
+                {"$setOnInsert": {"rating": rating, "date": datetime.now()}},
+                {"movies": [_movie_counters_update(movie_id, rating, 1)]},
+            )
+        ]
+    }
+
+
+def review_operations(movie_id, review: models.Review):
+    return {
+        "reviews": [
+            (
+                {"_id": str(uuid.uuid4())},
+                {"$setOnInsert": {"movie_id": movie_id} | review.model_dump()},
+            )
+        ]
+    }
+
+
+def bookmark_operations(user_id, movie_id):
+    return {
+        "bookmarks": [
+            (
+                {"user_id": user_id, "movie_id": movie_id},
+                {"$setOnInsert": {"date": datetime.now()}},
+            )
+        ]
+    }
+
+
+def _movie_counters_update(movie_id, rating, delta):
+    return ({"movie_id": movie_id}, {"$inc": rating_counters(rating, delta)})
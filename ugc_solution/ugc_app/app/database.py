@@ -1,10 +1,205 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
+import logging
+import threading
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from prometheus_client import Counter, Histogram
+from pymongo import monitoring
+from pymongo.errors import OperationFailure
 
 from app.core.config import settings
+from app.core.metrics import CallbackMetric
+
+logger = logging.getLogger(__name__)
+
+INDEX_BUILD_PROGRESS_INTERVAL = 5  # секунд
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """
+    Счётчики пула соединений Motor по событиям CMAP. Колбэки вызываются
+    из потоков драйвера, поэтому изменения счётчиков под блокировкой.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.created = 0
+        self.closed = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.check_out_failed = 0
+        self.cleared = 0
+
+    def _inc(self, **deltas):
+        with self._lock:
+            for counter, delta in deltas.items():
+                setattr(self, counter, getattr(self, counter) + delta)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "open": self.open,
+                "created": self.created,
+                "closed": self.closed,
+                "checked_out": self.checked_out,
+                "waiting": self.waiting,
+                "check_out_failed": self.check_out_failed,
+                "cleared": self.cleared,
+            }
+
+    def connection_created(self, event):
+        self._inc(created=1, open=1)
+
+    def connection_closed(self, event):
+        self._inc(closed=1, open=-1)
+
+    def connection_check_out_started(self, event):
+        self._inc(waiting=1)
+
+    def connection_checked_out(self, event):
+        self._inc(waiting=-1, checked_out=1)
+
+    def connection_check_out_failed(self, event):
+        self._inc(waiting=-1, check_out_failed=1)
+
+    def connection_checked_in(self, event):
+        self._inc(checked_out=-1)
+
+    def pool_cleared(self, event):
+        self._inc(cleared=1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+
+pool_stats = PoolStats()
+
+CallbackMetric(
+    "mongo_pool_connections",
+    "Motor connection pool connections by state",
+    "gauge",
+    ("state",),
+    lambda: {
+        (state,): value
+        for state, value in pool_stats.snapshot().items()
+        if state in ("open", "checked_out", "waiting")
+    },
+)
+
+mongo_commands_total = Counter(
+    "mongo_commands_total", "MongoDB commands", ("command", "result")
+)
+mongo_command_duration_seconds = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ("command",)
+)
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """
+    Число и время команд MongoDB по событиям command monitoring драйвера.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._observe(event, "ok")
+
+    def failed(self, event):
+        self._observe(event, "error")
+
+    @staticmethod
+    def _observe(event, result: str):
+        mongo_command_duration_seconds.labels(event.command_name).observe(
+            event.duration_micros / 1e6
+        )
+        mongo_commands_total.labels(event.command_name, result).inc()
+
+
+command_metrics = CommandMetrics()
+
+client: Optional[AsyncIOMotorClient] = None
+db: Optional[AsyncIOMotorDatabase] = None
+
+
+def create_client() -> AsyncIOMotorClient:
+    options: dict = {
+        "maxPoolSize": settings.mongo_max_pool_size,
+        "minPoolSize": settings.mongo_min_pool_size,
+        "readPreference": settings.mongo_read_preference,
+    }
+    if settings.mongo_max_idle_time_ms is not None:
+        options["maxIdleTimeMS"] = settings.mongo_max_idle_time_ms
+    if settings.mongo_wait_queue_timeout_ms is not None:
+        options["waitQueueTimeoutMS"] = settings.mongo_wait_queue_timeout_ms
+    if settings.mongo_compressors:
+        options["compressors"] = settings.mongo_compressors
+
+    return AsyncIOMotorClient(
+        "mongodb://" + settings.mongo_connect,
+        event_listeners=[pool_stats, command_metrics],
+        **options,
+    )
+
+
+async def get_database() -> AsyncIOMotorDatabase:
+    return db  # type: ignore
+
+
+async def ensure_indexes(db, indexes: dict):
+    """
+    Идемпотентно создаёт индексы {коллекция: [IndexModel]} и дожидается
+    окончания их сборки, периодически логируя прогресс. Если после этого
+    какого-то индекса нет, бросает RuntimeError, и приложение не стартует.
+    """
+    build = asyncio.ensure_future(_create_indexes(db, indexes))
+    while not build.done():
+        await asyncio.wait({build}, timeout=INDEX_BUILD_PROGRESS_INTERVAL)
+        if not build.done():
+            await _log_index_builds(db)
+    build.result()
+
+    for collection, models in indexes.items():
+        existing = await db[collection].index_information()
+        missing = [
+            model.document["name"]
+            for model in models
+            if model.document["name"] not in existing
+        ]
+        if missing:
+            raise RuntimeError(f"Missing indexes on {collection}: {missing}")
+
 
-client = AsyncIOMotorClient("mongodb://" + settings.mongo_connect)
-database = client[settings.mongo_db_name]
+async def _create_indexes(db, indexes: dict):
+    for collection, models in indexes.items():
+        names = await db[collection].create_indexes(models)
+        logger.info("UGC - Indexes on %s are ready: %s", collection, names)
 
 
-async def get_database():
-    return database
+async def _log_index_builds(db):
+    try:
+        cursor = db.client.admin.aggregate(
+            [
+                {"$currentOp": {"allUsers": True}},
+                {"$match": {"command.createIndexes": {"$exists": True}}},
+            ]
+        )
+        async for operation in cursor:
+            logger.info(
+                "UGC - Building indexes on %s: %s",
+                operation["command"]["createIndexes"],
+                operation.get("msg", "in progress"),
+            )
+    except OperationFailure:
+        logger.info("UGC - Index build is still in progress")
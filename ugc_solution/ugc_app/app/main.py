@@ -1,12 +1,18 @@
 import logging
 import os
 import sys
+from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI
 
+from app import database, write_buffer
 from app.api.v1 import endpoints, service
+from app.core.config import settings
 from app.core.logger import LOGGING
+from app.core.metrics import MetricsMiddleware
+from app.database import ensure_indexes
+from app.storage import crud
 
 sys.path.append(
     os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(__file__))))
@@ -18,7 +24,31 @@ sys.path.append(
 )
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    database.client = database.create_client()
+    database.db = database.client[settings.mongo_db_name]
+    await ensure_indexes(database.db, crud.INDEXES)
+    if settings.write_buffer_enabled:
+        write_buffer.write_buffer = write_buffer.WriteBuffer(
+            database.db,
+            flush_interval_ms=settings.write_buffer_flush_interval_ms,
+            max_batch_size=settings.write_buffer_max_batch_size,
+            max_queue_size=settings.write_buffer_max_queue_size,
+            put_timeout_ms=settings.write_buffer_put_timeout_ms,
+        )
+        write_buffer.write_buffer.start()
+
+    yield
+
+    if write_buffer.write_buffer:
+        await write_buffer.write_buffer.stop()
+    database.client.close()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+
 
 app.include_router(service.router, tags=["service"])
 app.include_router(endpoints.router, prefix="/api/v1", tags=["endpoints"])
@@ -1,11 +1,18 @@
 from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+RATINGS = range(0, 11)
+MAX_BATCH_MOVIES = 500
 
 
 class Like(BaseModel):
     movie_id: str
-    rating: int
+    rating: int = Field(ge=RATINGS.start, le=RATINGS.stop - 1)
+
+
+class MoviesBatch(BaseModel):
+    movie_ids: List[str] = Field(min_length=1, max_length=MAX_BATCH_MOVIES)
 
 
 class Bookmark(BaseModel):
@@ -1,15 +1,91 @@
+import copy
+import hashlib
 import http
 import time
+from collections import OrderedDict
 from typing import Optional
 
 import jwt
 from fastapi import HTTPException, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from prometheus_client import Counter
 
 from app.core.config import settings
+from app.core.metrics import CallbackMetric
+
+
+class TokenCache:
+    """
+    LRU-кэш раскодированных JWT. Ключ — sha256 токена, запись живёт
+    до exp самого токена. Кэшируются только валидные токены.
+    Запись отдаётся копией, чтобы запрос, изменивший payload,
+    не испортил его для остальных запросов с тем же токеном.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._tokens: OrderedDict = OrderedDict()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        decoded_token = self._tokens.get(key)
+        if decoded_token is None or decoded_token["exp"] < time.time():
+            self._tokens.pop(key, None)
+            self.misses += 1
+            return None
+
+        self._tokens.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(decoded_token)
+
+    def put(self, token: str, decoded_token: dict):
+        self._tokens[self._key(token)] = copy.deepcopy(decoded_token)
+        if len(self._tokens) > self.maxsize:
+            self._tokens.popitem(last=False)
+
+    def __len__(self):
+        return len(self._tokens)
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+
+token_cache = (
+    TokenCache(settings.jwt_cache_size) if settings.jwt_cache_enabled else None
+)
+
+CallbackMetric(
+    "jwt_cache_requests_total",
+    "Decoded JWT cache lookups by result",
+    "counter",
+    ("result",),
+    lambda: (
+        {("hit",): token_cache.hits, ("miss",): token_cache.misses}
+        if token_cache is not None
+        else {}
+    ),
+)
+auth_token_checks_total = Counter(
+    "auth_token_checks_total", "Bearer token checks by result", ("result",)
+)
 
 
 def decode_token(token: str) -> Optional[dict]:
+    if token_cache is None:
+        return _decode_token(token)
+
+    decoded_token = token_cache.get(token)
+    if decoded_token is None:
+        decoded_token = _decode_token(token)
+        if decoded_token:
+            token_cache.put(token, decoded_token)
+    return decoded_token
+
+
+def _decode_token(token: str) -> Optional[dict]:
     try:
         decoded_token = jwt.decode(
             token, settings.secret_key, algorithms=[settings.algorithm]
@@ -34,6 +110,7 @@ class JWTBearer(HTTPBearer):
             )
 
         decoded_token = self.parse_token(credentials.credentials)
+        auth_token_checks_total.labels("valid" if decoded_token else "invalid").inc()
         if not decoded_token:
             raise HTTPException(
                 status_code=http.HTTPStatus.FORBIDDEN,
@@ -0,0 +1,7 @@
+from app.core.config import settings
+
+# Выбор раскладки хранения UGC-данных, см. app.crud_collections
+if settings.storage_layout == "collections":
+    from app import crud_collections as crud  # noqa: F401
+else:
+    from app import crud  # noqa: F401
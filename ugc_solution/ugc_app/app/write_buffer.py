@@ -0,0 +1,150 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class WriteBufferFull(Exception):
+    pass
+
+
+class WriteBuffer:
+    """
+    Очередь отложенной записи: операции копятся в памяти процесса и уходят
+    в Mongo одним bulk_write на коллекцию раз в flush_interval_ms
+    или по достижении max_batch_size запросов.
+    """
+
+    def __init__(
+        self,
+        db,
+        flush_interval_ms: int,
+        max_batch_size: int,
+        max_queue_size: int,
+        put_timeout_ms: int,
+    ):
+        self.db = db
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.put_timeout = put_timeout_ms / 1000
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._batch_ready = asyncio.Event()
+        self._stopped = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # Задача не отменяется, а доводит запись до конца: после флага
+        # остановки она сбрасывает в Mongo всё, что осталось в очереди.
+        self._stopped = True
+        self._batch_ready.set()
+        if self._task:
+            await self._task
+
+    async def put(self, operations: dict):
+        # Backpressure: если очередь заполнена дольше put_timeout,
+        # запрос получает отказ вместо неограниченного роста памяти.
+        try:
+            await asyncio.wait_for(self.queue.put(operations), self.put_timeout)
+        except asyncio.TimeoutError:
+            raise WriteBufferFull
+        if self.queue.qsize() >= self.max_batch_size:
+            self._batch_ready.set()
+
+    async def _run(self):
+        while not self._stopped:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            await self._drain()
+        await self._drain()
+
+    async def _drain(self):
+        while not self.queue.empty():
+            batch_size = min(self.queue.qsize(), self.max_batch_size)
+            await self._flush([self.queue.get_nowait() for _ in range(batch_size)])
+
+    async def _flush(self, batch: list):
+        by_collection = defaultdict(list)
+        for operations in batch:
+            for collection, updates in operations.items():
+                by_collection[collection].extend(updates)
+
+        on_insert = []
+        for collection, updates in by_collection.items():
+            try:
+                on_insert += await self._bulk_write(collection, updates)
+            except Exception:
+                logger.exception(
+                    "UGC - Unable to flush %s operations to %s",
+                    len(updates),
+                    collection,
+                )
+
+        if on_insert:
+            await self._flush(on_insert)
+
+    async def _bulk_write(self, collection: str, updates: list) -> list:
+        # Элемент updates — (filter, update) или (filter, update, on_insert),
+        # где on_insert выполняется, только если upsert вставил документ.
+        requests = [UpdateOne(*update[:2], upsert=True) for update in updates]
+        retry = []
+        try:
+            result = await self.db[collection].bulk_write(requests, ordered=False)
+            upserted = result.upserted_ids
+        except BulkWriteError as error:
+            upserted = {
+                upsert["index"]: upsert["_id"] for upsert in error.details["upserted"]
+            }
+            # Параллельные upsert в один новый документ дают DuplicateKeyError
+            # у всех, кроме первого. Документ к этому моменту уже создан,
+            # поэтому повторяем такие операции без upsert. Настоящие повторы
+            # (лайк уже стоит) просто не найдут документ по фильтру.
+            for write_error in error.details["writeErrors"]:
+                if write_error["code"] == DUPLICATE_KEY_ERROR:
+                    retry.append(UpdateOne(*updates[write_error["index"]][:2]))
+                else:
+                    self._log_write_error(collection, write_error)
+
+        # Вставки первой попытки уже в базе, поэтому их on_insert
+        # выполняются, даже если повтор ниже не удастся.
+        on_insert = [updates[index][2] for index in upserted if len(updates[index]) > 2]
+        if retry:
+            try:
+                await self.db[collection].bulk_write(retry, ordered=False)
+            except BulkWriteError as error:
+                for write_error in error.details["writeErrors"]:
+                    self._log_write_error(collection, write_error)
+            except Exception:
+                logger.exception(
+                    "UGC - Unable to retry %s buffered writes to %s",
+                    len(retry),
+                    collection,
+                )
+        return on_insert
+
+    @staticmethod
+    def _log_write_error(collection: str, write_error: dict):
+        logger.error(
+            "UGC - Buffered write to %s failed: %s",
+            collection,
+            write_error["errmsg"],
+        )
+
+
+write_buffer: Optional[WriteBuffer] = None
+
+
+async def get_write_buffer() -> Optional[WriteBuffer]:
+    return write_buffer
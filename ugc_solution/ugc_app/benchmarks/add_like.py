@@ -0,0 +1,109 @@
+"""Сравнение пропускной способности старого и нового add_like.
+
+Запуск из каталога ugc_app при поднятом локальном mongod:
+    python -m benchmarks.add_like --mongo localhost:27017
+"""
+
+import argparse
+import asyncio
+from random import randint
+from time import perf_counter
+from uuid import uuid4
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError
+
+from app import crud
+from app.database import ensure_indexes
+
+
+# Прежние вспомогательные функции crud: из приложения они удалены вместе
+# с переходом на upsert. Уникальные индексы уже построены, поэтому
+# параллельная первая вставка того же документа считается «уже есть»,
+# а не обрывает весь прогон.
+async def _movie_exists(db, movie_id):
+    return bool(await db.movies.find_one({"movie_id": movie_id}, {"_id": 1}))
+
+
+async def _user_exists(db, user_id):
+    return bool(await db.users.find_one({"user_id": user_id}, {"_id": 1}))
+
+
+async def _add_movie(db, movie_id):
+    try:
+        await db.movies.insert_one({"movie_id": movie_id, "likes": {}, "reviews": {}})
+    except DuplicateKeyError:
+        pass
+
+
+async def _add_user(db, user_id):
+    try:
+        await db.users.insert_one({"user_id": user_id, "bookmarks": [], "likes": {}})
+    except DuplicateKeyError:
+        pass
+
+
+async def legacy_add_like(db, movie_id, user_id, rating):
+    # Прежняя реализация: до семи последовательных обращений к Mongo.
+    is_already_liked = await db.movies.find_one(
+        {"movie_id": movie_id, f"likes.{user_id}": {"$exists": True}}
+    )
+    if is_already_liked:
+        return False
+
+    if not await _movie_exists(db, movie_id):
+        await _add_movie(db, movie_id)
+
+    if not await _user_exists(db, user_id):
+        await _add_user(db, user_id)
+
+    result = await db.movies.update_one(
+        {"movie_id": movie_id, f"likes.{user_id}": {"$exists": False}},
+        {"$set": {f"likes.{user_id}": rating}, "$inc": {"likes_count": 1}},
+    )
+
+    if result.modified_count > 0:
+        await db.users.update_one(
+            {"user_id": user_id},
+            {"$set": {f"likes.{movie_id}": rating}},
+        )
+
+    return True
+
+
+async def run(db, add_like, movies: list, requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await add_like(db, movies[randint(0, len(movies) - 1)], str(uuid4()), 7)
+
+    start = perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return requests / (perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo", default="localhost:27017")
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--movies", type=int, default=1000)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient("mongodb://" + args.mongo)
+    movies = [str(uuid4()) for _ in range(args.movies)]
+
+    for name, add_like in (("старый", legacy_add_like), ("новый", crud.add_like)):
+        await client.drop_database("bench_add_like")
+        db = client["bench_add_like"]
+        await ensure_indexes(db, crud.INDEXES)
+        rps = await run(db, add_like, movies, args.requests, args.concurrency)
+        print(f"add_like ({name}): {rps:.0f} запросов/с")
+
+    await client.drop_database("bench_add_like")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
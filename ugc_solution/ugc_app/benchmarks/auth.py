@@ -0,0 +1,69 @@
+"""Накладные расходы на авторизацию запроса с кэшем JWT и без него.
+
+Прогоняет JWTBearer на запросах с набором токенов, которые повторяются
+так же, как у реальных клиентов, и печатает время на один запрос.
+
+Запуск из каталога ugc_app (SECRET_KEY и ALGORITHM берутся из .env):
+    python -m benchmarks.auth --requests 100000 --tokens 100
+"""
+
+import argparse
+import asyncio
+import time
+from random import randint
+
+import jwt
+from starlette.requests import Request
+
+from app import service_functions
+from app.core.config import settings
+
+
+def make_request(token: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "headers": [(b"authorization", f"Bearer {token}".encode())],
+        }
+    )
+
+
+async def measure(requests: list) -> float:
+    bearer = service_functions.JWTBearer()
+    start = time.perf_counter()
+    for request in requests:
+        await bearer(request)
+    return (time.perf_counter() - start) / len(requests) * 1_000_000
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--tokens", type=int, default=100)
+    args = parser.parse_args()
+
+    tokens = [
+        jwt.encode(
+            {"sub": f"user{number}", "exp": time.time() + 3600},
+            settings.secret_key,
+            algorithm=settings.algorithm,
+        )
+        for number in range(args.tokens)
+    ]
+    requests = [
+        make_request(tokens[randint(0, args.tokens - 1)]) for _ in range(args.requests)
+    ]
+
+    service_functions.token_cache = None
+    print(f"Без кэша: {await measure(requests):.1f} мкс/запрос")
+
+    service_functions.token_cache = service_functions.TokenCache(
+        settings.jwt_cache_size
+    )
+    print(f"С кэшем: {await measure(requests):.1f} мкс/запрос")
+    token_cache = service_functions.token_cache
+    print(f"Попаданий: {token_cache.hits}, промахов: {token_cache.misses}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
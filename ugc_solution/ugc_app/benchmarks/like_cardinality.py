@@ -0,0 +1,90 @@
+"""Задержка записи лайка в зависимости от числа лайков у фильма.
+
+Для каждой раскладки хранения фильм заполняется N лайками, после чего
+замеряется средняя задержка и p95 для новых лайков этого фильма.
+
+Запуск из каталога ugc_app при поднятом локальном mongod:
+    python -m benchmarks.like_cardinality --mongo localhost:27017
+"""
+
+import argparse
+import asyncio
+from statistics import mean, quantiles
+from time import perf_counter
+from uuid import uuid4
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import InsertOne
+
+from app import crud, crud_collections
+from app.database import ensure_indexes
+
+LAYOUTS = {"embedded": crud, "collections": crud_collections}
+
+
+async def fill_embedded(db, movie_id: str, likes: int):
+    await db.movies.update_one(
+        {"movie_id": movie_id},
+        {
+            "$set": {f"likes.{uuid4()}": 5 for _ in range(likes)},
+            "$inc": {"likes_count": likes},
+        },
+        upsert=True,
+    )
+
+
+async def fill_collections(db, movie_id: str, likes: int):
+    await db.likes.bulk_write(
+        [
+            InsertOne({"user_id": str(uuid4()), "movie_id": movie_id, "rating": 5})
+            for _ in range(likes)
+        ],
+        ordered=False,
+    )
+
+
+FILLERS = {"embedded": fill_embedded, "collections": fill_collections}
+
+
+async def measure(db, layout: str, cardinality: int, samples: int) -> list:
+    movie_id = str(uuid4())
+    for start in range(0, cardinality, 10000):
+        await FILLERS[layout](db, movie_id, min(10000, cardinality - start))
+
+    latencies = []
+    for _ in range(samples):
+        start = perf_counter()
+        await LAYOUTS[layout].add_like(db, movie_id, str(uuid4()), 7)
+        latencies.append((perf_counter() - start) * 1000)
+    return latencies
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo", default="localhost:27017")
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument(
+        "--cardinality", type=int, nargs="+", default=[100, 10000, 100000, 200000]
+    )
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient("mongodb://" + args.mongo)
+
+    for layout, module in LAYOUTS.items():
+        for cardinality in args.cardinality:
+            await client.drop_database("bench_like_cardinality")
+            db = client["bench_like_cardinality"]
+            await ensure_indexes(db, module.INDEXES)
+            latencies = await measure(db, layout, cardinality, args.samples)
+            print(
+                f"{layout:>11} | лайков у фильма: {cardinality:>7} | "
+                f"среднее: {mean(latencies):.2f} мс | "
+                f"p95: {quantiles(latencies, n=20)[-1]:.2f} мс"
+            )
+
+    await client.drop_database("bench_like_cardinality")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,233 @@
+"""Нагрузочный тест UGC API внутри процесса.
+
+Гоняет ASGI-приложение через httpx без сети и nginx смесью запросов,
+похожей на реальный трафик: чтение счётчиков и списков, лайки и их отмена,
+рецензии, закладки. По каждому эндпоинту считает p50/p95/p99 задержки
+и пропускную способность, результат сохраняет в JSON. С --baseline
+сравнивает p95 с прошлым прогоном и завершается с кодом 1, если
+какой-то эндпоинт замедлился сильнее --max-regression.
+
+Нужны httpx и mongomock-motor (без --mongo). Запуск из каталога ugc_app
+(SECRET_KEY и ALGORITHM берутся из .env):
+    python -m benchmarks.load_test --requests 20000 --output load.json
+    python -m benchmarks.load_test --mongo localhost:27017 --baseline load.json
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from collections import defaultdict
+from random import Random
+
+import httpx
+import jwt
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.config import settings
+from app.database import ensure_indexes, get_database
+from app.main import app
+from app.storage import crud
+
+DATABASE_NAME = "bench_load_test"
+
+# (вес, метод, шаблон пути для отчёта)
+TRAFFIC_MIX = [
+    (25, "GET", "/api/v1/movies/{movie_id}/likes"),
+    (15, "GET", "/api/v1/movies/{movie_id}/rating"),
+    (5, "POST", "/api/v1/movies/likes"),
+    (10, "GET", "/api/v1/users/me/bookmarks"),
+    (5, "GET", "/api/v1/users/me/likes"),
+    (15, "POST", "/api/v1/movies/like"),
+    (5, "DELETE", "/api/v1/movies/{movie_id}/like"),
+    (8, "POST", "/api/v1/movies/review"),
+    (8, "POST", "/api/v1/users/bookmark"),
+    (4, "DELETE", "/api/v1/users/bookmark/{movie_id}"),
+]
+
+
+class Traffic:
+    """
+    Генератор запросов смеси. Помнит поставленные лайки и закладки, чтобы
+    их отмена адресовалась существующим парам (пользователь, фильм),
+    а не давала почти сплошные 404.
+    """
+
+    def __init__(self, random: Random, users: int, movies: int):
+        self.random = random
+        self.users = [f"user{number}" for number in range(users)]
+        self.movies = [f"movie{number}" for number in range(movies)]
+        self.likes: list = []
+        self.bookmarks: list = []
+
+    def request(self, path: str) -> tuple:
+        user_id = self.random.choice(self.users)
+        movie_id = self.random.choice(self.movies)
+        body = None
+        params = None
+        if path == "/api/v1/movies/likes":
+            body = {"movie_ids": self.random.sample(self.movies, 20)}
+        elif path == "/api/v1/movies/like":
+            body = {"movie_id": movie_id, "rating": self.random.randint(0, 10)}
+            self.likes.append((user_id, movie_id))
+        elif path == "/api/v1/movies/review":
+            body = {
+                "movie_id": movie_id,
+                "text": "Load test review",
+                "rating": self.random.randint(0, 10),
+            }
+        elif path == "/api/v1/users/bookmark":
+            body = {"movie_id": movie_id}
+            self.bookmarks.append((user_id, movie_id))
+        elif path == "/api/v1/movies/{movie_id}/like" and self.likes:
+            user_id, movie_id = self._pop(self.likes)
+        elif path == "/api/v1/users/bookmark/{movie_id}" and self.bookmarks:
+            user_id, movie_id = self._pop(self.bookmarks)
+        elif path.startswith("/api/v1/users/me/"):
+            params = {"limit": 50}
+        return user_id, path.format(movie_id=movie_id), body, params
+
+    def _pop(self, pairs: list) -> tuple:
+        index = self.random.randrange(len(pairs))
+        pairs[index], pairs[-1] = pairs[-1], pairs[index]
+        return pairs.pop()
+
+
+def percentile(quantiles: list, value: int) -> float:
+    return round(quantiles[value - 1] * 1000, 3)
+
+
+def summarize(latencies: dict, statuses: dict, duration: float) -> dict:
+    endpoints = {}
+    for name, samples in sorted(latencies.items()):
+        quantiles = statistics.quantiles(samples, n=100, method="inclusive")
+        endpoints[name] = {
+            "requests": len(samples),
+            "rps": round(len(samples) / duration, 1),
+            "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+            "p50_ms": percentile(quantiles, 50),
+            "p95_ms": percentile(quantiles, 95),
+            "p99_ms": percentile(quantiles, 99),
+            "statuses": dict(sorted(statuses[name].items())),
+        }
+    total = sum(len(samples) for samples in latencies.values())
+    return {
+        "requests": total,
+        "duration_s": round(duration, 3),
+        "rps": round(total / duration, 1),
+        "endpoints": endpoints,
+    }
+
+
+async def run(client: httpx.AsyncClient, args) -> dict:
+    random = Random(args.seed)
+    traffic = Traffic(random, args.users, args.movies)
+    headers = {
+        user_id: {
+            "Authorization": "Bearer "
+            + jwt.encode(
+                {"sub": user_id, "exp": time.time() + 3600},
+                settings.secret_key,
+                algorithm=settings.algorithm,
+            )
+        }
+        for user_id in traffic.users
+    }
+    weights = [weight for weight, _, _ in TRAFFIC_MIX]
+    plan = iter(random.choices(TRAFFIC_MIX, weights, k=args.requests))
+
+    latencies = defaultdict(list)
+    statuses: dict = defaultdict(lambda: defaultdict(int))
+
+    # Замкнутая модель: concurrency клиентов, каждый шлёт следующий запрос
+    # сразу после ответа на предыдущий.
+    async def worker():
+        for _, method, path in plan:
+            user_id, url, body, params = traffic.request(path)
+            start = time.perf_counter()
+            response = await client.request(
+                method, url, json=body, params=params, headers=headers[user_id]
+            )
+            latencies[f"{method} {path}"].append(time.perf_counter() - start)
+            statuses[f"{method} {path}"][str(response.status_code)] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return summarize(latencies, statuses, time.perf_counter() - start)
+
+
+def compare(result: dict, baseline: dict, max_regression: float) -> bool:
+    passed = True
+    for name, stats in result["endpoints"].items():
+        previous = baseline["endpoints"].get(name)
+        if not previous:
+            continue
+        change = stats["p95_ms"] / previous["p95_ms"] - 1
+        regressed = change > max_regression
+        passed = passed and not regressed
+        print(
+            f"{name}: p95 {previous['p95_ms']} -> {stats['p95_ms']} мс "
+            f"({change:+.0%}){' РЕГРЕССИЯ' if regressed else ''}"
+        )
+    return passed
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo", help="адрес mongod, по умолчанию mongomock")
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--movies", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="load_test.json")
+    parser.add_argument("--baseline", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.mongo:
+        mongo_client = AsyncIOMotorClient("mongodb://" + args.mongo)
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+
+        mongo_client = AsyncMongoMockClient()
+    await mongo_client.drop_database(DATABASE_NAME)
+    db = mongo_client[DATABASE_NAME]
+    await ensure_indexes(db, crud.INDEXES)
+    app.dependency_overrides[get_database] = lambda: db
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://ugc") as client:
+        result = await run(client, args)
+
+    await mongo_client.drop_database(DATABASE_NAME)
+    result["config"] = {
+        "mongo": args.mongo or "mongomock",
+        "storage_layout": settings.storage_layout,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "users": args.users,
+        "movies": args.movies,
+        "seed": args.seed,
+    }
+
+    with open(args.output, "w") as output:
+        json.dump(result, output, indent=2, ensure_ascii=False)
+
+    print(f"Всего: {result['requests']} запросов, {result['rps']} запросов/с")
+    for name, stats in result["endpoints"].items():
+        print(
+            f"{name}: {stats['requests']} запросов, p50 {stats['p50_ms']} "
+            f"p95 {stats['p95_ms']} p99 {stats['p99_ms']} мс, {stats['statuses']}"
+        )
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            if not compare(result, json.load(baseline), args.max_regression):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
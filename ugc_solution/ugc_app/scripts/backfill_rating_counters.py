@@ -0,0 +1,55 @@
+"""Пересчёт счётчиков оценок фильмов в раскладке embedded.
+
+Заполняет likes_count, rating_sum, rating_count и rating_histogram
+по встроенной карте likes для документов, созданных до появления
+счётчиков. Скрипт идемпотентен.
+
+Запуск из каталога ugc_app:
+    python -m scripts.backfill_rating_counters --mongo localhost:27017 --db ugc
+"""
+
+import argparse
+import asyncio
+from collections import Counter
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+
+def count_ratings(ratings) -> dict:
+    ratings = list(ratings)
+    return {
+        "likes_count": len(ratings),
+        "rating_sum": sum(ratings),
+        "rating_count": len(ratings),
+        "rating_histogram": {
+            str(rating): count for rating, count in Counter(ratings).items()
+        },
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo", default="localhost:27017")
+    parser.add_argument("--db", required=True)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient("mongodb://" + args.mongo)
+    db = client[args.db]
+
+    updated = 0
+    async for movie in db.movies.find({}, {"likes": 1}):
+        # Обновление условно по той же карте лайков, чтобы не затереть
+        # счётчики, если за время пересчёта лайк добавили или сняли.
+        likes = movie.get("likes") or {}
+        result = await db.movies.update_one(
+            {"_id": movie["_id"], "likes": likes},
+            {"$set": count_ratings(likes.values())},
+        )
+        updated += result.modified_count
+    print(f"Обновлено фильмов: {updated}")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
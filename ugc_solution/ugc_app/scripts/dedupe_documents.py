@@ -0,0 +1,102 @@
+"""Слияние дублей документов фильмов и пользователей в раскладке embedded.
+
+До уникальных индексов на movies.movie_id и users.user_id параллельные
+запросы могли создать несколько документов с одним ключом, и тогда
+ensure_indexes не даёт приложению стартовать. Скрипт оставляет самый
+ранний документ каждого ключа, переносит в него лайки, рецензии и
+закладки остальных, пересчитывает счётчики оценок и удаляет лишние
+документы. Скрипт идемпотентен.
+
+Запуск из каталога ugc_app (до первого старта с уникальными индексами):
+    python -m scripts.dedupe_documents --mongo localhost:27017 --db ugc
+"""
+
+import argparse
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from scripts.backfill_rating_counters import count_ratings
+
+
+async def duplicate_groups(collection, key: str):
+    pipeline = [
+        {"$group": {"_id": f"${key}", "ids": {"$push": "$_id"}}},
+        {"$match": {"ids.1": {"$exists": True}}},
+    ]
+    async for group in collection.aggregate(pipeline, allowDiskUse=True):
+        documents = await collection.find({"_id": {"$in": group["ids"]}}).to_list(None)
+        yield sorted(documents, key=lambda document: document["_id"])
+
+
+def merge_maps(documents, field: str) -> dict:
+    # При конфликте ключей побеждает более ранний документ
+    merged: dict = {}
+    for document in reversed(documents):
+        merged.update(document.get(field) or {})
+    return merged
+
+
+async def dedupe_movies(db) -> int:
+    merged = 0
+    async for documents in duplicate_groups(db.movies, "movie_id"):
+        kept, *duplicates = documents
+        likes = merge_maps(documents, "likes")
+        await db.movies.update_one(
+            {"_id": kept["_id"]},
+            {
+                "$set": {
+                    "likes": likes,
+                    "reviews": merge_maps(documents, "reviews"),
+                    **count_ratings(likes.values()),
+                }
+            },
+        )
+        await db.movies.delete_many(
+            {"_id": {"$in": [document["_id"] for document in duplicates]}}
+        )
+        merged += len(duplicates)
+    return merged
+
+
+async def dedupe_users(db) -> int:
+    merged = 0
+    async for documents in duplicate_groups(db.users, "user_id"):
+        kept, *duplicates = documents
+        bookmarks = list(
+            dict.fromkeys(
+                movie_id
+                for document in documents
+                for movie_id in document.get("bookmarks") or []
+            )
+        )
+        await db.users.update_one(
+            {"_id": kept["_id"]},
+            {"$set": {"likes": merge_maps(documents, "likes"), "bookmarks": bookmarks}},
+        )
+        await db.users.delete_many(
+            {"_id": {"$in": [document["_id"] for document in duplicates]}}
+        )
+        merged += len(duplicates)
+    return merged
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo", default="localhost:27017")
+    parser.add_argument("--db", required=True)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient("mongodb://" + args.mongo)
+    db = client[args.db]
+
+    movies = await dedupe_movies(db)
+    print(f"Удалено дублей фильмов: {movies}")
+    users = await dedupe_users(db)
+    print(f"Удалено дублей пользователей: {users}")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+"""Перенос UGC-данных из раскладки embedded в раскладку collections.
+
+Миграция идемпотентна: документы переносятся upsert-ами, а счётчики
+фильма пересчитываются заново, поэтому скрипт можно перезапускать.
+
+Запуск из каталога ugc_app:
+    python -m scripts.migrate_to_collections --mongo localhost:27017 --db ugc
+"""
+
+import argparse
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+from app import crud_collections
+from app.database import ensure_indexes
+from scripts.backfill_rating_counters import count_ratings
+
+
+async def migrate_movies(db, drop_embedded: bool) -> int:
+    migrated = 0
+    async for movie in db.movies.find({}, {"movie_id": 1, "likes": 1, "reviews": 1}):
+        movie_id = movie["movie_id"]
+        likes = movie.get("likes") or {}
+        reviews = movie.get("reviews") or {}
+
+        if likes:
+            await db.likes.bulk_write(
+                [
+                    UpdateOne(
+                        {"user_id": user_id, "movie_id": movie_id},
+                        {"$setOnInsert": {"rating": rating}},
+                        upsert=True,
+                    )
+                    for user_id, rating in likes.items()
+                ],
+                ordered=False,
+            )
+        if reviews:
+            await db.reviews.bulk_write(
+                [
+                    UpdateOne(
+                        {"_id": review_id},
+                        {"$setOnInsert": {"movie_id": movie_id} | review},
+                        upsert=True,
+                    )
+                    for review_id, review in reviews.items()
+                ],
+                ordered=False,
+            )
+
+        update: dict = {"$set": count_ratings(likes.values())}
+        if drop_embedded:
+            update["$unset"] = {"likes": "", "reviews": ""}
+        await db.movies.update_one({"_id": movie["_id"]}, update)
+        migrated += 1
+    return migrated
+
+
+async def migrate_users(db, drop_embedded: bool) -> int:
+    migrated = 0
+    async for user in db.users.find({}, {"user_id": 1, "bookmarks": 1}):
+        bookmarks = user.get("bookmarks") or []
+        if bookmarks:
+            await db.bookmarks.bulk_write(
+                [
+                    UpdateOne(
+                        {"user_id": user["user_id"], "movie_id": movie_id},
+                        {"$setOnInsert": {"movie_id": movie_id}},
+                        upsert=True,
+                    )
+                    for movie_id in bookmarks
+                ],
+                ordered=False,
+            )
+        migrated += 1
+
+    # Лайки пользователя дублируют лайки фильма и уже перенесены выше,
+    # поэтому коллекция users в новой раскладке больше не нужна.
+    if drop_embedded:
+        await db.users.drop()
+    return migrated
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo", default="localhost:27017")
+    parser.add_argument("--db", required=True)
+    parser.add_argument(
+        "--drop-embedded",
+        action="store_true",
+        help="удалить встроенные likes/reviews и коллекцию users после переноса",
+    )
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient("mongodb://" + args.mongo)
+    db = client[args.db]
+
+    await ensure_indexes(db, crud_collections.INDEXES)
+    movies = await migrate_movies(db, args.drop_embedded)
+    print(f"Перенесено фильмов: {movies}")
+    users = await migrate_users(db, args.drop_embedded)
+    print(f"Перенесено пользователей: {users}")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -33,6 +33,13 @@ async def client():
         yield ac
 
 
+@pytest_asyncio.fixture
+async def internal_client():
+    # Напрямую в приложение, минуя nginx: так ходит Prometheus
+    async with AsyncClient(base_url="http://web:8000") as ac:
+        yield ac
+
+
 @pytest_asyncio.fixture
 async def db():
     # Создание подключения к тестовой базе данных
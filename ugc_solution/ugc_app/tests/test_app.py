@@ -12,6 +12,27 @@ async def test_health(client):
     assert response.json() == {"status": "UP"}
 
 
+@pytest.mark.asyncio
+async def test_metrics(client, internal_client):
+    await client.get("/health")
+    response = await internal_client.get("/metrics")
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_requests_total{method="GET",route="/health",status="200"}' in (
+        response.text
+    )
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "path", ["/metrics", "/internal/token_cache", "/internal/mongo_pool"]
+)
+async def test_internal_routes_are_not_public(client, path):
+    response = await client.get(path)
+    assert response.status_code == HTTPStatus.FORBIDDEN
+
+
 @pytest.mark.asyncio
 async def test_add_like(client, db):
     like_data = {"movie_id": "movie123", "rating": 7}
@@ -20,6 +41,20 @@ async def test_add_like(client, db):
     assert response.json() == {"message": "Like added"}
 
 
+@pytest.mark.asyncio
+async def test_add_like_twice(client, db):
+    like_data = {"movie_id": "movie123", "rating": 7}
+    await client.post("/api/v1/movies/like", json=like_data)
+    response = await client.post(
+        "/api/v1/movies/like", json={"movie_id": "movie123", "rating": 9}
+    )
+    assert response.status_code == HTTPStatus.CONFLICT
+
+    movie = await db.movies.find_one({"movie_id": "movie123"})
+    assert movie["likes"] == {"kimkanovsky": 7}
+    assert movie["likes_count"] == 1
+
+
 @pytest.mark.asyncio
 async def test_delete_like(client, db):
     await db.movies.insert_one(
@@ -116,6 +151,47 @@ async def test_get_movie_likes(client, db):
     assert response.json() == {"likes_count": 10}
 
 
+@pytest.mark.asyncio
+async def test_get_movies_likes(client, db):
+    await db.movies.insert_many(
+        [
+            {"movie_id": "movie123", "likes_count": 10},
+            {"movie_id": "movie456", "likes_count": 3},
+        ]
+    )
+    response = await client.post(
+        "/api/v1/movies/likes",
+        json={"movie_ids": ["movie123", "movie456", "movie789"]},
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        "likes_count": {"movie123": 10, "movie456": 3, "movie789": 0}
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_movie_rating(client, db):
+    await db.movies.insert_one(
+        {
+            "movie_id": "movie123",
+            "likes_count": 2,
+            "rating_sum": 15,
+            "rating_count": 2,
+            "rating_histogram": {"7": 1, "8": 1},
+        }
+    )
+    response = await client.get(
+        "/api/v1/movies/movie123/rating",
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        "likes_count": 2,
+        "rating_count": 2,
+        "average_rating": 7.5,
+        "histogram": {str(rating): 0 for rating in range(11)} | {"7": 1, "8": 1},
+    }
+
+
 @pytest.mark.asyncio
 async def test_get_user_bookmarks(client, db):
     await db.users.insert_one(
@@ -125,7 +201,51 @@ async def test_get_user_bookmarks(client, db):
         "/api/v1/users/me/bookmarks",
     )
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == {"bookmarks": ["movie123", "movie456"]}
+    assert response.json() == {
+        "bookmarks": ["movie123", "movie456"],
+        "next_cursor": None,
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_user_bookmarks_pages(client, db):
+    await db.users.insert_one(
+        {"user_id": "kimkanovsky", "bookmarks": ["movie123", "movie456", "movie789"]}
+    )
+    response = await client.get("/api/v1/users/me/bookmarks", params={"limit": 2})
+    assert response.status_code == HTTPStatus.OK
+    first_page = response.json()
+    assert first_page["bookmarks"] == ["movie123", "movie456"]
+
+    response = await client.get(
+        "/api/v1/users/me/bookmarks",
+        params={"limit": 2, "cursor": first_page["next_cursor"]},
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {"bookmarks": ["movie789"], "next_cursor": None}
+
+    response = await client.get(
+        "/api/v1/users/me/bookmarks", params={"count_only": True}
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {"count": 3}
+
+
+@pytest.mark.asyncio
+async def test_get_user_bookmarks_pages_after_delete(client, db):
+    await db.users.insert_one(
+        {"user_id": "kimkanovsky", "bookmarks": ["movie1", "movie2", "movie3"]}
+    )
+    response = await client.get("/api/v1/users/me/bookmarks", params={"limit": 2})
+    first_page = response.json()
+
+    await client.delete("/api/v1/users/bookmark/movie1")
+    response = await client.get(
+        "/api/v1/users/me/bookmarks",
+        params={"limit": 2, "cursor": first_page["next_cursor"]},
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {"bookmarks": ["movie3"], "next_cursor": None}
 
 
 @pytest.mark.asyncio
@@ -137,4 +257,7 @@ async def test_get_user_likes(client, db):
         "/api/v1/users/me/likes",
     )
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == {"likes": {"movie123": 7, "movie456": 8}}
+    assert response.json() == {
+        "likes": {"movie123": 7, "movie456": 8},
+        "next_cursor": None,
+    }
@@ -0,0 +1,96 @@
+# tests/test_crud.py
+
+import pytest
+import pytest_asyncio
+from mongomock_motor import AsyncMongoMockClient
+
+from app import crud
+from app.database import ensure_indexes
+
+
+@pytest_asyncio.fixture
+async def mock_db():
+    db = AsyncMongoMockClient().test_db
+    await ensure_indexes(db, crud.INDEXES)
+    return db
+
+
+async def bookmark(db, *movie_ids):
+    for movie_id in movie_ids:
+        await crud.add_bookmark(db, "kimkanovsky", movie_id)
+
+
+@pytest.mark.asyncio
+async def test_user_bookmarks_pages(mock_db):
+    await bookmark(mock_db, "movie1", "movie2", "movie3", "movie4", "movie5")
+
+    first = await crud.get_user_bookmarks(mock_db, "kimkanovsky", 2)
+    second = await crud.get_user_bookmarks(
+        mock_db, "kimkanovsky", 2, first["next_cursor"]
+    )
+    third = await crud.get_user_bookmarks(
+        mock_db, "kimkanovsky", 2, second["next_cursor"]
+    )
+    assert first["bookmarks"] == ["movie1", "movie2"]
+    assert second["bookmarks"] == ["movie3", "movie4"]
+    assert third == {"bookmarks": ["movie5"], "next_cursor": None}
+
+
+@pytest.mark.asyncio
+async def test_user_bookmarks_pages_after_delete(mock_db):
+    await bookmark(mock_db, "movie1", "movie2", "movie3", "movie4")
+    first = await crud.get_user_bookmarks(mock_db, "kimkanovsky", 2)
+
+    # Удаление уже выданных закладок не сдвигает следующую страницу
+    await crud.delete_bookmark(mock_db, "kimkanovsky", "movie1")
+    second = await crud.get_user_bookmarks(
+        mock_db, "kimkanovsky", 2, first["next_cursor"]
+    )
+    assert second == {"bookmarks": ["movie3", "movie4"], "next_cursor": None}
+
+
+@pytest.mark.asyncio
+async def test_user_bookmarks_pages_after_last_deleted(mock_db):
+    await bookmark(mock_db, "movie1", "movie2", "movie3", "movie4")
+    first = await crud.get_user_bookmarks(mock_db, "kimkanovsky", 2)
+
+    await crud.delete_bookmark(mock_db, "kimkanovsky", "movie2")
+    second = await crud.get_user_bookmarks(
+        mock_db, "kimkanovsky", 2, first["next_cursor"]
+    )
+    assert second == {"bookmarks": ["movie3", "movie4"], "next_cursor": None}
+
+
+@pytest.mark.asyncio
+async def test_user_likes_pages(mock_db):
+    for movie_id, rating in [("movie1", 7), ("movie2", 8), ("movie3", 9)]:
+        await crud.add_like(mock_db, movie_id, "kimkanovsky", rating)
+
+    first = await crud.get_user_likes(mock_db, "kimkanovsky", 2)
+    assert first["likes"] == {"movie1": 7, "movie2": 8}
+
+    await crud.delete_like(mock_db, "movie1", "kimkanovsky")
+    second = await crud.get_user_likes(mock_db, "kimkanovsky", 2, first["next_cursor"])
+    assert second == {"likes": {"movie3": 9}, "next_cursor": None}
+    assert await crud.count_user_likes(mock_db, "kimkanovsky") == {"count": 2}
+
+
+@pytest.mark.asyncio
+async def test_user_pages_of_unknown_user(mock_db):
+    assert await crud.get_user_bookmarks(mock_db, "kimkanovsky", 2) == {
+        "bookmarks": [],
+        "next_cursor": None,
+    }
+    assert await crud.get_user_likes(mock_db, "kimkanovsky", 2) == {
+        "likes": {},
+        "next_cursor": None,
+    }
+
+
+@pytest.mark.parametrize("position", ["not-a-position", "2:", "x:movie1"])
+@pytest.mark.asyncio
+async def test_invalid_cursor(mock_db, position):
+    with pytest.raises(crud.InvalidCursorError):
+        await crud.get_user_bookmarks(
+            mock_db, "kimkanovsky", 2, crud.encode_cursor(position)
+        )
@@ -0,0 +1,133 @@
+# tests/test_crud_collections.py
+
+import pytest
+import pytest_asyncio
+from mongomock_motor import AsyncMongoMockClient
+
+from app import crud_collections, models
+from app.database import ensure_indexes
+
+
+@pytest_asyncio.fixture
+async def mock_db():
+    db = AsyncMongoMockClient().test_db
+    await ensure_indexes(db, crud_collections.INDEXES)
+    return db
+
+
+@pytest.mark.asyncio
+async def test_add_like(mock_db):
+    assert await crud_collections.add_like(mock_db, "movie123", "kimkanovsky", 7)
+    assert await crud_collections.add_like(mock_db, "movie123", "another_user", 4)
+
+    rating = await crud_collections.get_movie_rating(mock_db, "movie123")
+    assert rating["likes_count"] == 2
+    assert rating["average_rating"] == 5.5
+    assert rating["histogram"]["7"] == 1
+    assert rating["histogram"]["4"] == 1
+
+
+@pytest.mark.asyncio
+async def test_add_like_twice(mock_db):
+    await crud_collections.add_like(mock_db, "movie123", "kimkanovsky", 7)
+    assert not await crud_collections.add_like(mock_db, "movie123", "kimkanovsky", 9)
+
+    assert await mock_db.likes.count_documents({"movie_id": "movie123"}) == 1
+    rating = await crud_collections.get_movie_rating(mock_db, "movie123")
+    assert rating["likes_count"] == 1
+    assert rating["average_rating"] == 7
+
+
+@pytest.mark.asyncio
+async def test_delete_like(mock_db):
+    await crud_collections.add_like(mock_db, "movie123", "kimkanovsky", 7)
+
+    assert await crud_collections.delete_like(mock_db, "movie123", "kimkanovsky")
+    assert not await crud_collections.delete_like(mock_db, "movie123", "kimkanovsky")
+
+    rating = await crud_collections.get_movie_rating(mock_db, "movie123")
+    assert rating["likes_count"] == 0
+    assert rating["average_rating"] is None
+    assert rating["histogram"]["7"] == 0
+
+
+@pytest.mark.asyncio
+async def test_review_round_trip(mock_db):
+    review = models.Review(user_id="kimkanovsky", text="Great movie!", rating=9)
+    assert await crud_collections.add_review(mock_db, "movie123", review)
+    stored = await mock_db.reviews.find_one({"movie_id": "movie123"})
+    assert stored["text"] == "Great movie!"
+
+    updated = models.Review(user_id="kimkanovsky", text="Updated review.", rating=7)
+    assert await crud_collections.edit_review(
+        mock_db, "movie123", stored["_id"], updated
+    )
+    assert not await crud_collections.edit_review(
+        mock_db, "movie456", stored["_id"], updated
+    )
+    stored = await mock_db.reviews.find_one({"_id": stored["_id"]})
+    assert stored["text"] == "Updated review."
+    assert stored["rating"] == 7
+
+    assert await crud_collections.delete_review(mock_db, "movie123", stored["_id"])
+    assert not await crud_collections.delete_review(mock_db, "movie123", stored["_id"])
+
+
+@pytest.mark.asyncio
+async def test_bookmark_round_trip(mock_db):
+    assert await crud_collections.add_bookmark(mock_db, "kimkanovsky", "movie123")
+    assert not await crud_collections.add_bookmark(mock_db, "kimkanovsky", "movie123")
+    assert await crud_collections.count_user_bookmarks(mock_db, "kimkanovsky") == {
+        "count": 1
+    }
+
+    assert await crud_collections.delete_bookmark(mock_db, "kimkanovsky", "movie123")
+    assert not await crud_collections.delete_bookmark(
+        mock_db, "kimkanovsky", "movie123"
+    )
+    assert await crud_collections.get_user_bookmarks(mock_db, "kimkanovsky", 10) == {
+        "bookmarks": [],
+        "next_cursor": None,
+    }
+
+
+@pytest.mark.asyncio
+async def test_user_likes_pages(mock_db):
+    for movie_id, rating in [("movie1", 7), ("movie2", 8), ("movie3", 9)]:
+        await crud_collections.add_like(mock_db, movie_id, "kimkanovsky", rating)
+    await crud_collections.add_like(mock_db, "movie1", "another_user", 5)
+
+    first = await crud_collections.get_user_likes(mock_db, "kimkanovsky", 2)
+    assert first["likes"] == {"movie1": 7, "movie2": 8}
+    assert first["next_cursor"] is not None
+
+    # Удаление уже выданного лайка не сдвигает следующую страницу
+    await crud_collections.delete_like(mock_db, "movie1", "kimkanovsky")
+    second = await crud_collections.get_user_likes(
+        mock_db, "kimkanovsky", 2, first["next_cursor"]
+    )
+    assert second == {"likes": {"movie3": 9}, "next_cursor": None}
+    assert await crud_collections.count_user_likes(mock_db, "kimkanovsky") == {
+        "count": 2
+    }
+
+
+@pytest.mark.asyncio
+async def test_user_bookmarks_pages(mock_db):
+    for movie_id in ["movie1", "movie2", "movie3", "movie4"]:
+        await crud_collections.add_bookmark(mock_db, "kimkanovsky", movie_id)
+
+    first = await crud_collections.get_user_bookmarks(mock_db, "kimkanovsky", 2)
+    second = await crud_collections.get_user_bookmarks(
+        mock_db, "kimkanovsky", 2, first["next_cursor"]
+    )
+    assert first["bookmarks"] == ["movie1", "movie2"]
+    assert second["bookmarks"] == ["movie3", "movie4"]
+    assert second["next_cursor"] is None
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor(mock_db):
+    cursor = crud_collections.encode_cursor("not-an-object-id")
+    with pytest.raises(crud_collections.InvalidCursorError):
+        await crud_collections.get_user_likes(mock_db, "kimkanovsky", 2, cursor)
@@ -0,0 +1,111 @@
+# tests/test_query_plans.py
+
+import pytest
+import pytest_asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+from app import crud, crud_collections, models
+from app.database import ensure_indexes
+from app.write_buffer import WriteBuffer
+
+QUERY_COMMANDS = {"find", "update", "delete", "findAndModify", "aggregate", "count"}
+SKIPPED_FIELDS = {"lsid", "txnNumber", "writeConcern", "readConcern"}
+
+
+class CommandRecorder(monitoring.CommandListener):
+    def __init__(self):
+        self.commands = []
+
+    def started(self, event):
+        if event.command_name not in QUERY_COMMANDS or event.database_name == "admin":
+            return
+        command = {
+            key: value
+            for key, value in event.command.items()
+            if not key.startswith("$") and key not in SKIPPED_FIELDS
+        }
+        # explain принимает update/delete только с одной операцией,
+        # поэтому пачки из bulk_write разбиваются на отдельные команды.
+        statements = {"update": "updates", "delete": "deletes"}.get(event.command_name)
+        if statements:
+            for statement in command[statements]:
+                self.commands.append(command | {statements: [statement]})
+        else:
+            self.commands.append(command)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def plan_stages(explain):
+    # Все стадии выбранных планов, отвергнутые планы не учитываются.
+    if isinstance(explain, dict):
+        for key, value in explain.items():
+            if key == "stage":
+                yield value
+            elif key != "rejectedPlans":
+                yield from plan_stages(value)
+    elif isinstance(explain, list):
+        for value in explain:
+            yield from plan_stages(value)
+
+
+async def exercise_crud(crud_module, db):
+    review = models.Review(user_id="user1", text="Great movie!", rating=9)
+
+    await crud_module.add_like(db, "movie1", "user1", 7)
+    await crud_module.add_like(db, "movie1", "user1", 7)
+    await crud_module.add_like(db, "movie3", "user1", 8)
+    await crud_module.get_movie_likes(db, "movie1")
+    await crud_module.get_movies_likes(db, ["movie1", "movie3"])
+    await crud_module.get_movie_rating(db, "movie1")
+    likes = await crud_module.get_user_likes(db, "user1", 1)
+    await crud_module.get_user_likes(db, "user1", 1, likes["next_cursor"])
+    await crud_module.count_user_likes(db, "user1")
+    await crud_module.delete_like(db, "movie1", "user1")
+    await crud_module.add_review(db, "movie1", review)
+    await crud_module.edit_review(db, "movie1", "review1", review)
+    await crud_module.delete_review(db, "movie1", "review1")
+    await crud_module.add_bookmark(db, "user1", "movie1")
+    await crud_module.add_bookmark(db, "user1", "movie1")
+    await crud_module.add_bookmark(db, "user1", "movie3")
+    bookmarks = await crud_module.get_user_bookmarks(db, "user1", 1)
+    await crud_module.get_user_bookmarks(db, "user1", 1, bookmarks["next_cursor"])
+    await crud_module.count_user_bookmarks(db, "user1")
+    await crud_module.delete_bookmark(db, "user1", "movie1")
+
+    write_buffer = WriteBuffer(db, 50, 100, 100, 1000)
+    await write_buffer._flush(
+        [
+            crud_module.like_operations("movie2", "user2", 5),
+            crud_module.review_operations("movie2", review),
+            crud_module.bookmark_operations("user2", "movie2"),
+        ]
+    )
+
+
+@pytest_asyncio.fixture
+async def recorded_db():
+    recorder = CommandRecorder()
+    client = AsyncIOMotorClient("mongodb://mongodb:27017", event_listeners=[recorder])
+    yield client.test_query_plans, recorder
+    await client.drop_database("test_query_plans")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("crud_module", [crud, crud_collections])
+async def test_crud_queries_use_indexes(recorded_db, crud_module):
+    db, recorder = recorded_db
+    await ensure_indexes(db, crud_module.INDEXES)
+
+    recorder.commands.clear()
+    await exercise_crud(crud_module, db)
+    assert recorder.commands
+
+    for command in recorder.commands:
+        explain = await db.command({"explain": command, "verbosity": "queryPlanner"})
+        assert "COLLSCAN" not in set(plan_stages(explain)), command
@@ -0,0 +1,90 @@
+# tests/test_token_cache.py
+
+import http
+import time
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app import service_functions
+from app.core.config import settings
+from app.service_functions import TokenCache, decode_token, security_jwt
+
+
+def make_token(user_id="kimkanovsky", expires_in=3600):
+    return jwt.encode(
+        {"sub": user_id, "role": [], "exp": int(time.time()) + expires_in},
+        settings.secret_key,
+        algorithm=settings.algorithm,
+    )
+
+
+def make_request(token):
+    return Request(
+        {"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]}
+    )
+
+
+@pytest.fixture
+def token_cache(monkeypatch):
+    cache = TokenCache(maxsize=2)
+    monkeypatch.setattr(service_functions, "token_cache", cache)
+    return cache
+
+
+def test_cached_token(token_cache):
+    token = make_token()
+
+    assert decode_token(token)["user_id"] == "kimkanovsky"
+    assert decode_token(token)["user_id"] == "kimkanovsky"
+    assert (token_cache.hits, token_cache.misses) == (1, 1)
+
+
+def test_cached_token_is_a_copy(token_cache):
+    token = make_token()
+    decode_token(token)["role"].append("admin")
+    decoded_token = decode_token(token)
+    decoded_token["user_id"] = "another_user"
+
+    assert decode_token(token)["role"] == []
+    assert decode_token(token)["user_id"] == "kimkanovsky"
+
+
+def test_expired_entry(token_cache):
+    token_cache.put("token", {"user_id": "kimkanovsky", "exp": time.time() - 1})
+
+    assert token_cache.get("token") is None
+    assert len(token_cache) == 0
+    assert token_cache.misses == 1
+
+
+def test_lru_eviction(token_cache):
+    expires = time.time() + 3600
+    token_cache.put("first", {"user_id": "first", "exp": expires})
+    token_cache.put("second", {"user_id": "second", "exp": expires})
+    token_cache.get("first")
+    token_cache.put("third", {"user_id": "third", "exp": expires})
+
+    assert len(token_cache) == 2
+    assert token_cache.get("second") is None
+    assert token_cache.get("first")["user_id"] == "first"
+    assert token_cache.get("third")["user_id"] == "third"
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        "not-a-jwt",
+        make_token(expires_in=-10),
+        jwt.encode({"sub": "kimkanovsky", "exp": 2719262107}, "wrong-secret"),
+    ],
+)
+@pytest.mark.asyncio
+async def test_denied_token(token_cache, token):
+    with pytest.raises(HTTPException) as error:
+        await security_jwt(make_request(token))
+
+    assert error.value.status_code == http.HTTPStatus.FORBIDDEN
+    assert len(token_cache) == 0
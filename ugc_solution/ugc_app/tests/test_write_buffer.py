@@ -0,0 +1,154 @@
+# tests/test_write_buffer.py
+
+import logging
+
+import pytest
+import pytest_asyncio
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import AutoReconnect
+
+from app import crud
+from app.database import ensure_indexes
+from app.write_buffer import WriteBuffer
+
+
+@pytest_asyncio.fixture
+async def mock_db():
+    db = AsyncMongoMockClient().test_db
+    await ensure_indexes(db, crud.INDEXES)
+    return db
+
+
+class FailingCollection:
+    # Коллекция, у которой все bulk_write после первого падают
+    def __init__(self, collection, failures):
+        self.collection = collection
+        self.failures = failures
+
+    async def bulk_write(self, requests, ordered=True):
+        self.failures["calls"] += 1
+        if self.failures["calls"] > 1:
+            raise AutoReconnect("connection reset")
+        return await self.collection.bulk_write(requests, ordered=ordered)
+
+
+class FailingRetryDb:
+    def __init__(self, db, collection):
+        self.db = db
+        self.collection = collection
+        self.failures = {"calls": 0}
+
+    def __getitem__(self, name):
+        if name == self.collection:
+            return FailingCollection(self.db[name], self.failures)
+        return self.db[name]
+
+
+@pytest_asyncio.fixture
+async def write_buffer(mock_db):
+    buffer = WriteBuffer(
+        mock_db,
+        flush_interval_ms=10,
+        max_batch_size=100,
+        max_queue_size=100,
+        put_timeout_ms=100,
+    )
+    buffer.start()
+    yield buffer
+    await buffer.stop()
+
+
+@pytest.mark.asyncio
+async def test_flush_on_stop(mock_db, write_buffer):
+    await write_buffer.put(crud.like_operations("movie123", "kimkanovsky", 7))
+    await write_buffer.put(crud.bookmark_operations("kimkanovsky", "movie456"))
+    await write_buffer.stop()
+
+    movie = await mock_db.movies.find_one({"movie_id": "movie123"})
+    assert movie["likes"] == {"kimkanovsky": 7}
+    assert movie["likes_count"] == 1
+    user = await mock_db.users.find_one({"user_id": "kimkanovsky"})
+    assert user["likes"] == {"movie123": 7}
+    assert user["bookmarks"] == ["movie456"]
+    assert write_buffer.queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_duplicate_like_in_one_batch(mock_db, write_buffer):
+    await write_buffer.put(crud.like_operations("movie123", "kimkanovsky", 7))
+    await write_buffer.put(crud.like_operations("movie123", "kimkanovsky", 9))
+    await write_buffer.stop()
+
+    movie = await mock_db.movies.find_one({"movie_id": "movie123"})
+    user = await mock_db.users.find_one({"user_id": "kimkanovsky"})
+    assert movie["likes"] == {"kimkanovsky": 7}
+    assert movie["rating_sum"] == 7
+    assert user["likes"] == {"movie123": 7}
+
+
+@pytest.mark.asyncio
+async def test_duplicate_like_in_next_batch(mock_db, write_buffer):
+    await write_buffer._flush([crud.like_operations("movie123", "kimkanovsky", 7)])
+    await write_buffer._flush([crud.like_operations("movie123", "kimkanovsky", 9)])
+
+    movie = await mock_db.movies.find_one({"movie_id": "movie123"})
+    user = await mock_db.users.find_one({"user_id": "kimkanovsky"})
+    assert movie["likes"] == {"kimkanovsky": 7}
+    assert movie["likes_count"] == 1
+    assert user["likes"] == {"movie123": 7}
+
+
+@pytest.mark.asyncio
+async def test_likes_of_new_movie_from_many_users(mock_db, write_buffer):
+    await write_buffer._flush(
+        [
+            crud.like_operations("movie123", "kimkanovsky", 7),
+            crud.like_operations("movie123", "another_user", 5),
+        ]
+    )
+
+    assert await mock_db.movies.count_documents({"movie_id": "movie123"}) == 1
+    movie = await mock_db.movies.find_one({"movie_id": "movie123"})
+    assert movie["likes"] == {"kimkanovsky": 7, "another_user": 5}
+    assert movie["rating_count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_retry_keeps_on_insert(mock_db, caplog):
+    await mock_db.movies.insert_one(
+        {"movie_id": "movie123", "likes": {"kimkanovsky": 7}, "likes_count": 1}
+    )
+    buffer = WriteBuffer(FailingRetryDb(mock_db, "movies"), 10, 100, 100, 100)
+    new_movie = (
+        {"movie_id": "movie456"},
+        {"$setOnInsert": {"likes": {}}},
+        {
+            "users": [
+                ({"user_id": "kimkanovsky"}, {"$set": {"bookmarks": ["movie456"]}})
+            ]
+        },
+    )
+    # Повторный лайк: upsert упирается в уникальный индекс и уходит в повтор
+    repeated_like = crud.like_operations("movie123", "kimkanovsky", 9)["movies"][0]
+
+    with caplog.at_level(logging.ERROR):
+        await buffer._flush([{"movies": [new_movie, repeated_like]}])
+
+    assert "Unable to retry 1 buffered writes to movies" in caplog.text
+    movie = await mock_db.movies.find_one({"movie_id": "movie123"})
+    assert movie["likes"] == {"kimkanovsky": 7}
+    user = await mock_db.users.find_one({"user_id": "kimkanovsky"})
+    assert user["bookmarks"] == ["movie456"]
+
+
+@pytest.mark.asyncio
+async def test_failed_collection_does_not_block_others(mock_db, caplog):
+    buffer = WriteBuffer(FailingRetryDb(mock_db, "users"), 10, 100, 100, 100)
+    buffer.db.failures["calls"] = 1
+
+    with caplog.at_level(logging.ERROR):
+        await buffer._flush([crud.like_operations("movie123", "kimkanovsky", 7)])
+
+    assert "Unable to flush 1 operations to users" in caplog.text
+    movie = await mock_db.movies.find_one({"movie_id": "movie123"})
+    assert movie["likes"] == {"kimkanovsky": 7}